@@ -5,8 +5,10 @@ from slowapi import Limiter
 from slowapi.util import get_remote_address
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from backend.core.deps import get_db
+from backend.core.deps import get_db, get_async_db
 from backend.core.security import (
     hashed_password,
     verify_password,
@@ -18,7 +20,7 @@ from backend.core.config import get_settings
 from backend.models.users import User
 from backend.models.refresh_sessions import RefreshSession
 from backend.schemas.auth import UserCreate, UserLogin, UserOut
-from backend.core.relevant_day import is_relevant_day
+from backend.core.user_cache import UserSnapshot, user_cache
 
 router = APIRouter(prefix = "/auth", tags = ["auth"])
 settings = get_settings()
@@ -37,9 +39,22 @@ def _hash_token(token: str) -> str:
 auth_scheme = HTTPBearer()
 auth_scheme_optional = HTTPBearer(auto_error = False)
 
-def get_current_user(
+async def _load_user(user_id: int, db: AsyncSession) -> UserSnapshot | None:
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+
+    # только чтение: суточный сброс учитывается лениво в UserSnapshot.daily_used_time
+    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
+    if not user:
+        return None
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.put(snapshot)
+    return snapshot
+
+async def get_current_user(
     creds: HTTPAuthorizationCredentials = Depends(auth_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     token = creds.credentials
     try:
@@ -50,18 +65,14 @@ def get_current_user(
     if payload.get("type") != "access":
         raise HTTPException(status_code = status.HTTP_401_UNAUTHORIZED, detail="Invalid token type")
     
-    user_id = int(payload["sub"])
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await _load_user(int(payload["sub"]), db)
     if not user:
         raise HTTPException(status_code = status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    
-    is_relevant_day(user)
-    db.commit()
 
     return user
-def get_current_user_optional(
+async def get_current_user_optional(
     creds: HTTPAuthorizationCredentials | None = Security(auth_scheme_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if creds is None:
         return None
@@ -75,15 +86,7 @@ def get_current_user_optional(
     if payload.get("type") != "access":
         return None
     
-    user_id = int(payload["sub"])
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        return None
-    
-    is_relevant_day(user)
-    db.commit()
-
-    return user
+    return await _load_user(int(payload["sub"]), db)
 
 @router.post("/register", response_model = UserOut, status_code = 201)
 @limiter.limit("3/minute")
@@ -219,7 +222,7 @@ def logout(
                 
 @router.post("/logout_all")
 def logout_all(
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     response: Response = None,
     db: Session = Depends(get_db)
 ):
@@ -234,5 +237,12 @@ def logout_all(
     return {"detail": "Logged out from all session"}
 
 @router.get("/me", response_model = UserOut)
-def me(current_user: User = Depends(get_current_user)):
-    return current_user
\ No newline at end of file
+def me(current_user: UserSnapshot = Depends(get_current_user)):
+    # снимок - dataclass, FastAPI сериализует его через asdict() без свойства daily_used_time
+    return UserOut(
+        id=current_user.id,
+        email=current_user.email,
+        created_at=current_user.created_at,
+        tariff_plan=current_user.tariff_plan,
+        daily_used_time=current_user.daily_used_time,
+    )
\ No newline at end of file
@@ -1,65 +1,176 @@
 #backend/api/v1/transcriptions.py
+import base64
+from collections import OrderedDict
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import select
-from backend.core.deps import get_db
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, tuple_
+from backend.core.deps import get_async_db
 from backend.api.v1.auth_users import get_current_user_optional
-from backend.models.transcription_tasks import TranscriptionTask
+from backend.models.transcription_tasks import TranscriptionTask, TranscriptionStatus
 from backend.models.anon_users import AnonUser
-from backend.schemas.transcriptions import TranscriptionItem
+from backend.schemas.transcriptions import TranscriptionItem, TranscriptionDetail
+from backend.transcript_formats import EXPORT_FORMATS, render, unpack_segments
 from uuid import UUID as UUID_cls
 
 router = APIRouter(prefix="/transcriptions", tags=["transcriptions"])
 
+RENDER_CACHE_SIZE = 256
+RECENT_PAGE_DEFAULT = 20
+RECENT_PAGE_MAX = 100
+PREVIEW_CHARS = 300
+_render_cache: OrderedDict[tuple[int, str], str] = OrderedDict()
+
 @router.get("/recent", response_model=list[TranscriptionItem])
-def recent_transcriptions(
+async def recent_transcriptions(
+    response: Response,
     anon_uuid: str | None = Query(None),
-    db: Session = Depends(get_db),
+    limit: int = Query(RECENT_PAGE_DEFAULT, ge=1, le=RECENT_PAGE_MAX),
+    before: str | None = Query(None),
+    db: AsyncSession = Depends(get_async_db),
     user = Depends(get_current_user_optional)
     ):
-    tasks = []
-    if user is not None:
-        stmt = (
-            select(TranscriptionTask)
-            .where(TranscriptionTask.user_id == user.id)
-            .order_by(TranscriptionTask.created_at.desc())
+    if user is None and anon_uuid is None:
+        return []
+
+    # только нужные колонки: без joined-загрузки user/anon_user и без полного текста
+    stmt = (
+        select(
+            TranscriptionTask.id,
+            TranscriptionTask.created_at,
+            TranscriptionTask.status,
+            func.substr(TranscriptionTask.transcription_text, 1, PREVIEW_CHARS).label("preview"),
+            func.coalesce(func.char_length(TranscriptionTask.transcription_text), 0).label("text_length"),
         )
-        tasks = db.execute(stmt).scalars().all()
-        
-    elif anon_uuid is not None:
-        try:
-            anon_uuid_obj = UUID_cls(anon_uuid)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid anon user UUID")
-
-        anon = (
-            db.execute(
-                select(AnonUser).where(AnonUser.uuid == anon_uuid_obj)
-            )
-            .scalars()
-            .first()
+        .order_by(TranscriptionTask.created_at.desc(), TranscriptionTask.id.desc())
+        .limit(limit + 1)
+    )
+    stmt = _owned_task_stmt(stmt, user, anon_uuid)
+    if before is not None:
+        cursor_created_at, cursor_id = _decode_cursor(before)
+        stmt = stmt.where(
+            tuple_(TranscriptionTask.created_at, TranscriptionTask.id) < tuple_(cursor_created_at, cursor_id)
+        )
+    rows = (await db.execute(stmt)).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return [
+        TranscriptionItem(
+            id=row.id,
+            created_at=row.created_at,
+            status=row.status,
+            text=row.preview or "",
+            text_length=row.text_length,
+            truncated=row.text_length > PREVIEW_CHARS,
         )
+        for row in rows
+    ]
 
-        if anon:
-            stmt = (
-                select(TranscriptionTask)
-                .where(
-                    TranscriptionTask.anon_user_id == anon.id,
-                    TranscriptionTask.user_id.is_(None),  # ← критично
-                )
-                .order_by(TranscriptionTask.created_at.desc())
-            )
-            tasks = db.execute(stmt).scalars().all()
-    
-    result: list[TranscriptionItem] = []
-    for task in tasks:
-        result.append(TranscriptionItem(
-            id=task.id,
-            created_at=task.created_at,
-            status=task.status,
-            text=task.transcription_text or ""
-            )
+
+def _encode_cursor(created_at: datetime, task_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{task_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, task_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(task_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _owned_task_stmt(stmt, user, anon_uuid: str | None):
+    if user is not None:
+        return stmt.where(TranscriptionTask.user_id == user.id)
+    if anon_uuid is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    try:
+        anon_uuid_obj = UUID_cls(anon_uuid)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid anon user UUID")
+    return (
+        stmt.join(AnonUser, AnonUser.id == TranscriptionTask.anon_user_id)
+        .where(
+            AnonUser.uuid == anon_uuid_obj,
+            TranscriptionTask.user_id.is_(None),
         )
+    )
+
+
+@router.get("/{task_id}", response_model=TranscriptionDetail)
+async def transcription_detail(
+    task_id: int,
+    anon_uuid: str | None = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    user = Depends(get_current_user_optional)
+    ):
+    stmt = select(
+        TranscriptionTask.id,
+        TranscriptionTask.created_at,
+        TranscriptionTask.status,
+        TranscriptionTask.transcription_text,
+        TranscriptionTask.duration_seconds,
+        TranscriptionTask.error,
+    ).where(TranscriptionTask.id == task_id)
+    row = (await db.execute(_owned_task_stmt(stmt, user, anon_uuid))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Transcription not found")
+    return TranscriptionDetail(
+        id=row.id,
+        created_at=row.created_at,
+        status=row.status,
+        text=row.transcription_text or "",
+        duration_seconds=row.duration_seconds,
+        error=row.error,
+    )
+
+
+@router.get("/{task_id}/export")
+async def export_transcription(
+    task_id: int,
+    format: str = Query("txt"),
+    anon_uuid: str | None = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    user = Depends(get_current_user_optional)
+    ):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported export format")
+
+    stmt = select(
+        TranscriptionTask.status,
+        TranscriptionTask.transcription_text,
+        TranscriptionTask.transcription_json,
+    ).where(TranscriptionTask.id == task_id)
+    row = (await db.execute(_owned_task_stmt(stmt, user, anon_uuid))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Transcription not found")
+    if row.status != TranscriptionStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail="Transcription is not completed yet")
+
+    key = (task_id, format)
+    body = _render_cache.get(key)
+    if body is None:
+        segments = unpack_segments(row.transcription_json)
+        if segments is not None:
+            body = render(segments, format)
+        elif format == "txt":
+            body = row.transcription_text or ""
+        else:
+            raise HTTPException(status_code=404, detail="Segments are not available for this transcription")
+        _render_cache[key] = body
+        if len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    else:
+        _render_cache.move_to_end(key)
 
-    return result
-        
+    return Response(
+        content=body,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="transcription-{task_id}.{format}"'},
+    )
@@ -0,0 +1,56 @@
+# backend/bench/compare.py
+import argparse
+import json
+import sys
+from pathlib import Path
+
+METRICS = ("wall_seconds", "peak_rss_mb", "temp_disk_bytes")
+
+
+def _index(report: dict) -> dict[tuple[str, str], dict]:
+    return {(r["fixture"], r["stage"]): r for r in report["results"] if "error" not in r}
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> tuple[list[str], list[str]]:
+    base = _index(baseline)
+    new = _index(candidate)
+    lines = []
+    regressions = []
+    for key in sorted(base.keys() & new.keys()):
+        for metric in METRICS:
+            before = base[key].get(metric) or 0
+            after = new[key].get(metric) or 0
+            if before == after:
+                continue
+            change = (after - before) / before if before else float("inf")
+            line = f"{key[0]:<24} {key[1]:<10} {metric:<16} {before:>12} -> {after:>12} ({change:+.1%})"
+            lines.append(line)
+            if change > threshold:
+                regressions.append(line)
+    for key in sorted(base.keys() - new.keys()):
+        lines.append(f"{key[0]:<24} {key[1]:<10} missing in candidate")
+    return lines, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    candidate = json.loads(Path(args.candidate).read_text())
+    lines, regressions = compare(baseline, candidate, args.threshold)
+    for line in lines:
+        print(line)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# backend/bench/fixtures.py
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+
+DURATIONS = {
+    "10s": 10,
+    "1m": 60,
+    "10m": 10 * 60,
+    "60m": 60 * 60,
+}
+
+# все источники детерминированы: без случайного сида ffmpeg шум не генерирует
+SIGNALS = {
+    "tone": "sine=frequency=440:sample_rate=16000",
+    "noise": "anoisesrc=color=pink:seed=42:amplitude=0.3:sample_rate=16000",
+    # гармоники ~140 Гц с огибающей 4 Гц (слоги) и паузой 0.6 с каждые 3 с, чтобы VAD резал файл
+    "speechlike": (
+        "aevalsrc='0.6*pow(sin(2*PI*4*t),2)*gt(mod(t,3),0.6)"
+        "*(sin(2*PI*140*t)+0.5*sin(2*PI*280*t)+0.25*sin(2*PI*420*t)+0.12*sin(2*PI*700*t))'"
+        ":sample_rate=16000"
+    ),
+}
+
+# расширение -> (media type, формат ffmpeg, кодеки)
+CONTAINERS = {
+    "wav": ("audio/wav", "wav", ["-c:a", "pcm_s16le"]),
+    "mp3": ("audio/mpeg", "mp3", ["-c:a", "libmp3lame", "-b:a", "64k"]),
+    "ogg": ("audio/ogg", "ogg", ["-c:a", "libopus", "-b:a", "32k"]),
+    "mp4": ("video/mp4", "mp4", ["-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-b:a", "64k"]),
+    "mkv": ("video/x-matroska", "matroska", ["-c:v", "libx264", "-preset", "ultrafast", "-c:a", "libopus", "-b:a", "32k"]),
+}
+
+BITEXACT = ["-fflags", "+bitexact", "-flags:v", "+bitexact", "-flags:a", "+bitexact"]
+
+
+@dataclass
+class Fixture:
+    name: str
+    path: Path
+    media_type: str
+    duration_seconds: int
+
+
+def generate(directory: Path, sizes: list[str], signals: list[str], containers: list[str]) -> list[Fixture]:
+    directory.mkdir(parents=True, exist_ok=True)
+    fixtures = []
+    for size in sizes:
+        for signal in signals:
+            for container in containers:
+                fixtures.append(_ensure(directory, size, signal, container))
+    return fixtures
+
+
+def _ensure(directory: Path, size: str, signal: str, container: str) -> Fixture:
+    name = f"{signal}-{size}.{container}"
+    path = directory / name
+    media_type, muxer, codec_args = CONTAINERS[container]
+    duration = DURATIONS[size]
+    if not path.exists():
+        command = ["ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", SIGNALS[signal]]
+        if media_type.startswith("video"):
+            command += ["-f", "lavfi", "-i", "color=c=gray:size=320x240:rate=5"]
+            command += ["-map", "1:v", "-map", "0:a"]
+        partial = path.with_name(f".{name}")
+        command += ["-t", str(duration), "-ac", "1", *codec_args, *BITEXACT, "-f", muxer, str(partial)]
+        subprocess.run(command, check=True)
+        partial.rename(path)
+    return Fixture(name=name, path=path, media_type=media_type, duration_seconds=duration)
@@ -0,0 +1,193 @@
+# backend/bench/run.py
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from backend.bench.fixtures import CONTAINERS, DURATIONS, SIGNALS, Fixture, generate
+
+STAGES = ("probe", "decode", "inference", "pipeline")
+DISK_SAMPLE_SECONDS = 0.05
+
+
+def _dir_bytes(directory: str) -> int:
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class _DiskSampler:
+    def __init__(self, directories: list[str]) -> None:
+        self.directories = directories
+        self.baseline = sum(_dir_bytes(d) for d in directories)
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def _sample(self) -> None:
+        used = sum(_dir_bytes(d) for d in self.directories) - self.baseline
+        self.peak = max(self.peak, used)
+
+    def _run(self) -> None:
+        while not self._stop.wait(DISK_SAMPLE_SECONDS):
+            self._sample()
+
+
+def _run_stage(stage: str, fixture: Fixture, model_size: str) -> float:
+    from backend.media_probe import probe_media_seconds
+    from backend.transcription import decode_audio, transcription, which_file
+
+    path = str(fixture.path)
+    if stage == "probe":
+        started = time.perf_counter()
+        asyncio.run(probe_media_seconds(path))
+        return time.perf_counter() - started
+    if stage == "decode":
+        started = time.perf_counter()
+        decode_audio(path, fixture.duration_seconds)
+        return time.perf_counter() - started
+    if stage == "inference":
+        audio = decode_audio(path, fixture.duration_seconds)
+        started = time.perf_counter()
+        transcription(audio, model_size)
+        return time.perf_counter() - started
+    if stage == "pipeline":
+        started = time.perf_counter()
+        which_file(path, fixture.media_type, model_size, fixture.duration_seconds)
+        return time.perf_counter() - started
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def _measure(conn, stage: str, fixture: Fixture, model_size: str, repeat: int) -> None:
+    from backend.transcription import files_dir, model_registry
+
+    if stage in ("inference", "pipeline"):
+        # загрузка модели не входит в замер
+        with model_registry.acquire(model_size):
+            pass
+
+    with _DiskSampler([files_dir, tempfile.gettempdir()]) as disk:
+        walls = [_run_stage(stage, fixture, model_size) for _ in range(repeat)]
+
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    wall = statistics.median(walls)
+    conn.send({
+        "fixture": fixture.name,
+        "stage": stage,
+        "media_seconds": fixture.duration_seconds,
+        "wall_seconds": round(wall, 4),
+        "wall_seconds_all": [round(w, 4) for w in walls],
+        "rtf": round(wall / fixture.duration_seconds, 5),
+        "peak_rss_mb": round(max(own, children) / 1024, 1),
+        "temp_disk_bytes": disk.peak,
+    })
+    conn.close()
+
+
+def measure(stage: str, fixture: Fixture, model_size: str, repeat: int) -> dict:
+    # каждый замер в отдельном процессе, чтобы пиковый RSS не копился между стадиями
+    ctx = mp.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_measure, args=(child_conn, stage, fixture, model_size, repeat))
+    process.start()
+    child_conn.close()
+    try:
+        result = parent_conn.recv()
+    except EOFError:
+        result = {"fixture": fixture.name, "stage": stage, "error": f"exit code {process.exitcode}"}
+    process.join()
+    return result
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _csv(value: str, choices) -> list[str]:
+    items = list(choices) if value == "all" else value.split(",")
+    unknown = [item for item in items if item not in choices]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown values: {', '.join(unknown)}")
+    return items
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark decode → inference pipeline")
+    parser.add_argument("--fixtures-dir", default="bench_fixtures")
+    parser.add_argument("--sizes", default="10s,1m", type=lambda v: _csv(v, DURATIONS))
+    parser.add_argument("--signals", default="speechlike", type=lambda v: _csv(v, SIGNALS))
+    parser.add_argument("--containers", default="wav,mp3,ogg,mp4", type=lambda v: _csv(v, CONTAINERS))
+    parser.add_argument("--stages", default="all", type=lambda v: _csv(v, STAGES))
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--out", default="-")
+    args = parser.parse_args()
+
+    fixtures = generate(Path(args.fixtures_dir), args.sizes, args.signals, args.containers)
+    results = []
+    for fixture in fixtures:
+        for stage in args.stages:
+            result = measure(stage, fixture, args.model, args.repeat)
+            results.append(result)
+            print(
+                f"[bench] {fixture.name:<24} {stage:<10} "
+                f"wall={result.get('wall_seconds')} rtf={result.get('rtf')} "
+                f"rss={result.get('peak_rss_mb')}MB disk={result.get('temp_disk_bytes')}",
+                flush=True,
+            )
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "model": args.model,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    data = json.dumps(report, indent=2)
+    if args.out == "-":
+        print(data)
+    else:
+        Path(args.out).write_text(data)
+
+
+if __name__ == "__main__":
+    main()
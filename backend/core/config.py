@@ -18,12 +18,115 @@ class Settings:
         self.access_token_expire_minutes = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
         self.refresh_token_expire_days = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
 
+        self.db_pool_size = int(os.getenv("DB_POOL_SIZE", "10"))
+        self.db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+        self.db_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+        self.db_pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+        self.db_statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+        self.transcription_slots = int(os.getenv("TRANSCRIPTION_SLOTS", "1"))
+        self.transcription_queue_max = int(os.getenv("TRANSCRIPTION_QUEUE_MAX", "50"))
+        self.transcription_realtime_factor = float(os.getenv("TRANSCRIPTION_REALTIME_FACTOR", "0.5"))
+        # порядок запуска задач: fifo, priority (по тарифу), fair (fair share), sjf (короткие первыми)
+        self.transcription_policy = os.getenv("TRANSCRIPTION_POLICY", "fifo")
+        # на сколько секунд длительности «укорачивается» задача за секунду ожидания в sjf
+        self.transcription_sjf_aging_rate = float(os.getenv("TRANSCRIPTION_SJF_AGING_RATE", "2"))
+        # "thread" - инференс в процессе API, "process" - пул отдельных процессов
+        self.transcription_executor = os.getenv("TRANSCRIPTION_EXECUTOR", "thread")
+        self.transcription_process_workers = int(
+            os.getenv("TRANSCRIPTION_PROCESS_WORKERS", str(self.transcription_slots))
+        )
+        self.transcription_process_cpu_threads = int(os.getenv("TRANSCRIPTION_PROCESS_CPU_THREADS", "0"))
+        # бюджет памяти моделей на процесс; 0 - WHISPER_MEMORY_BUDGET_MB поровну между процессами
+        self.transcription_process_memory_mb = int(os.getenv("TRANSCRIPTION_PROCESS_MEMORY_MB", "0"))
+
+        self.whisper_default_model = os.getenv("WHISPER_DEFAULT_MODEL", "small")
+        self.whisper_model_sizes = os.getenv("WHISPER_MODEL_SIZES", "small,medium,large-v3").split(",")
+        self.whisper_memory_budget_mb = int(os.getenv("WHISPER_MEMORY_BUDGET_MB", "8000"))
+        self.whisper_device = os.getenv("WHISPER_DEVICE", "cpu")
+        self.whisper_compute_type = os.getenv("WHISPER_COMPUTE_TYPE", "float32")
+        self.whisper_cpu_threads = int(os.getenv("WHISPER_CPU_THREADS", "3"))
+        self.whisper_num_workers = int(os.getenv("WHISPER_NUM_WORKERS", "1"))
+        self.whisper_word_timestamps = os.getenv("WHISPER_WORD_TIMESTAMPS", "0") == "1"
+
+        # микропакеты: клипы не длиннее batch_max_clip_seconds копятся до batch_max_size штук
+        # или batch_window_ms и проходят через BatchedInferencePipeline одним вызовом
+        self.batch_inference_enabled = os.getenv("BATCH_INFERENCE_ENABLED", "1") == "1"
+        self.batch_max_clip_seconds = int(os.getenv("BATCH_MAX_CLIP_SECONDS", "30"))
+        self.batch_max_size = int(os.getenv("BATCH_MAX_SIZE", "8"))
+        self.batch_window_ms = int(os.getenv("BATCH_WINDOW_MS", "200"))
+
+        self.long_file_min_seconds = int(os.getenv("LONG_FILE_MIN_SECONDS", "1800"))
+        self.long_file_chunk_seconds = int(os.getenv("LONG_FILE_CHUNK_SECONDS", "300"))
+        self.long_file_parallelism = int(os.getenv("LONG_FILE_PARALLELISM", "2"))
+
+        self.task_state_cache_size = int(os.getenv("TASK_STATE_CACHE_SIZE", "10000"))
+        self.task_state_final_ttl = float(os.getenv("TASK_STATE_FINAL_TTL", "600"))
+        self.task_state_active_ttl = float(os.getenv("TASK_STATE_ACTIVE_TTL", "1"))
+        # сколько секунд держать завершённую задачу в памяти процесса (для SSE и поллинга)
+        self.task_local_ttl = float(os.getenv("TASK_LOCAL_TTL", "60"))
+
+        # восстановление прерванных задач при старте
+        self.task_recovery_enabled = os.getenv("TASK_RECOVERY_ENABLED", "1") == "1"
+        self.task_recovery_batch_size = int(os.getenv("TASK_RECOVERY_BATCH_SIZE", "100"))
+        self.task_recovery_max_tasks = int(os.getenv("TASK_RECOVERY_MAX_TASKS", "1000"))
+        # аренда задачи воркером: продлевается каждые task_lease_renew_seconds,
+        # задачу с истёкшей арендой перезапускает любой живой воркер
+        self.task_lease_seconds = float(os.getenv("TASK_LEASE_SECONDS", "120"))
+        self.task_lease_renew_seconds = float(os.getenv("TASK_LEASE_RENEW_SECONDS", "30"))
+        self.task_recovery_interval = float(os.getenv("TASK_RECOVERY_INTERVAL", "60"))
+        # файлы в TASKS_DIR моложе этого возраста не трогаем: их может писать другой воркер
+        self.orphan_file_min_age = float(os.getenv("ORPHAN_FILE_MIN_AGE", "3600"))
+
+        self.upload_max_mb = int(os.getenv("UPLOAD_MAX_MB", "2048"))
+        # одновременные ffmpeg, декодирующие загрузку на лету
+        self.ingest_max_decoders = int(os.getenv("INGEST_MAX_DECODERS", "2"))
+        # незавершённая докачка удаляется после этого времени без новых кусков
+        self.upload_expire_seconds = float(os.getenv("UPLOAD_EXPIRE_SECONDS", str(24 * 3600)))
+
+        # общий секрет для /internal/*: пустой - внутренний API выключен
+        self.internal_api_token = os.getenv("INTERNAL_API_TOKEN", "")
+
+        # снимки пользователей для авторизации без похода в БД на каждый запрос
+        self.user_cache_ttl = float(os.getenv("USER_CACHE_TTL", "30"))
+        self.user_cache_size = int(os.getenv("USER_CACHE_SIZE", "10000"))
+        self.quota_ledger_ttl = float(os.getenv("QUOTA_LEDGER_TTL", "30"))
+        self.quota_ledger_size = int(os.getenv("QUOTA_LEDGER_SIZE", "10000"))
+
+        # обслуживание: удаление порциями по maintenance_batch_size строк на транзакцию
+        self.maintenance_tick = float(os.getenv("MAINTENANCE_TICK", "60"))
+        self.maintenance_batch_size = int(os.getenv("MAINTENANCE_BATCH_SIZE", "500"))
+        self.maintenance_max_batches = int(os.getenv("MAINTENANCE_MAX_BATCHES", "200"))
+        self.maintenance_batch_pause = float(os.getenv("MAINTENANCE_BATCH_PAUSE", "0.05"))
+        self.anon_ttl_seconds = int(os.getenv("ANON_TTL_SECONDS", str(24 * 3600)))
+        self.anon_cleanup_interval = float(os.getenv("ANON_CLEANUP_INTERVAL", "3600"))
+        self.session_purge_interval = float(os.getenv("SESSION_PURGE_INTERVAL", "3600"))
+        self.file_sweep_interval = float(os.getenv("FILE_SWEEP_INTERVAL", "900"))
+        self.file_sweep_limit = int(os.getenv("FILE_SWEEP_LIMIT", "1000"))
+        # временные файлы транскрипции живут всё время инференса, поэтому порог больше
+        self.temp_file_min_age = float(os.getenv("TEMP_FILE_MIN_AGE", str(6 * 3600)))
+
+        self.media_probe_timeout_seconds = float(os.getenv("MEDIA_PROBE_TIMEOUT_SECONDS", "30"))
+
+        self.result_cache_enabled = os.getenv("RESULT_CACHE_ENABLED", "1") == "1"
+        self.result_cache_dir = os.getenv("RESULT_CACHE_DIR", "/root/filety/backend/cache")
+        self.result_cache_max_mb = int(os.getenv("RESULT_CACHE_MAX_MB", "512"))
+        # "charge" - попадание в кэш списывает лимит как обычно, "free" - не списывает
+        self.result_cache_quota_policy = os.getenv("RESULT_CACHE_QUOTA_POLICY", "charge")
+
     @property
     def database_url(self) -> str:
         return (
             f"postgresql+psycopg2://{self.postgres_user}:{self.postgres_password}"
             f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
         )
+
+    @property
+    def async_database_url(self) -> str:
+        return (
+            f"postgresql+asyncpg://{self.postgres_user}:{self.postgres_password}"
+            f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+        )
 @lru_cache()
 def get_settings() -> Settings:
     return Settings()
\ No newline at end of file
@@ -9,6 +9,20 @@ DAILY_LIMIT_PLUS_USER: int = 3600
 DAILY_LIMIT_PRO_USER: int = 6000
 DAILY_LIMIT_PREMIUM_USER: Optional[int] = None  
 
+# приоритет в очереди транскрипции: чем выше тариф, тем больше
+PRIORITY_ANON_USER: int = 0
+PRIORITY_FREE_USER: int = 1
+PRIORITY_PLUS_USER: int = 2
+PRIORITY_PRO_USER: int = 3
+PRIORITY_PREMIUM_USER: int = 4
+PRIORITY_TIER_NAMES: dict[int, str] = {0: "anon", 1: "free", 2: "plus", 3: "pro", 4: "premium"}
+
+MODEL_SIZE_ANON_USER: str = "small"
+MODEL_SIZE_FREE_USER: str = "small"
+MODEL_SIZE_PLUS_USER: str = "medium"
+MODEL_SIZE_PRO_USER: str = "large-v3"
+MODEL_SIZE_PREMIUM_USER: str = "large-v3"
+
 def get_daily_limit_for_user(user: "User") -> int | None:
     if user.tariff_plan == 0:
         return DAILY_LIMIT_FREE_USER
@@ -19,4 +33,28 @@ def get_daily_limit_for_user(user: "User") -> int | None:
     elif user.tariff_plan == 3:
         return DAILY_LIMIT_PREMIUM_USER
     else:
-        return DAILY_LIMIT_FREE_USER
\ No newline at end of file
+        return DAILY_LIMIT_FREE_USER
+
+def get_model_size_for_user(user: "User | None") -> str:
+    if user is None:
+        return MODEL_SIZE_ANON_USER
+    if user.tariff_plan == 1:
+        return MODEL_SIZE_PLUS_USER
+    elif user.tariff_plan == 2:
+        return MODEL_SIZE_PRO_USER
+    elif user.tariff_plan == 3:
+        return MODEL_SIZE_PREMIUM_USER
+    else:
+        return MODEL_SIZE_FREE_USER
+
+def get_priority_for_user(user: "User | None") -> int:
+    if user is None:
+        return PRIORITY_ANON_USER
+    if user.tariff_plan == 1:
+        return PRIORITY_PLUS_USER
+    elif user.tariff_plan == 2:
+        return PRIORITY_PRO_USER
+    elif user.tariff_plan == 3:
+        return PRIORITY_PREMIUM_USER
+    else:
+        return PRIORITY_FREE_USER
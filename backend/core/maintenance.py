@@ -0,0 +1,140 @@
+# backend/core/maintenance.py
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from sqlalchemy import delete, or_, select, update
+
+from backend.core import metrics
+from backend.db.session import AsyncSessionLocal
+from backend.models.anon_users import AnonUser
+from backend.models.refresh_sessions import RefreshSession
+from backend.models.transcription_tasks import TranscriptionTask
+
+
+@dataclass
+class MaintenanceJob:
+    name: str
+    interval: float
+    run: Callable[[], Awaitable[int]]
+    next_run: float = 0.0
+
+
+# периодические задачи обслуживания в одном цикле; каждая работает ограниченными порциями
+class MaintenanceScheduler:
+    def __init__(self, jobs: list[MaintenanceJob], tick: float) -> None:
+        self.jobs = jobs
+        self.tick = tick
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_job(self, job: MaintenanceJob) -> None:
+        started = time.perf_counter()
+        try:
+            count = await job.run()
+        except Exception as exc:
+            print(f"[maintenance] {job.name} failed: {exc}")
+            return
+        finally:
+            job.next_run = time.monotonic() + job.interval
+        elapsed = time.perf_counter() - started
+        metrics.MAINTENANCE_SECONDS.labels(job=job.name).observe(elapsed)
+        metrics.MAINTENANCE_ITEMS.labels(job=job.name).inc(count)
+        if count:
+            print(f"[maintenance] {job.name}: {count} items in {elapsed:.2f}s")
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            for job in self.jobs:
+                if job.next_run <= now:
+                    await self.run_job(job)
+            await asyncio.sleep(self.tick)
+
+
+async def _delete_in_batches(build_ids, delete_batch, batch_size: int, max_batches: int, pause: float) -> int:
+    total = 0
+    for _ in range(max_batches):
+        async with AsyncSessionLocal() as db, db.begin():
+            ids = (await db.execute(build_ids().limit(batch_size).with_for_update(skip_locked=True))).scalars().all()
+            if ids:
+                await delete_batch(db, ids)
+        total += len(ids)
+        if len(ids) < batch_size:
+            break
+        # короткая пауза между транзакциями, чтобы не держать блокировки и не забивать диск
+        await asyncio.sleep(pause)
+    return total
+
+
+async def delete_expired_anon_users(ttl_seconds: float, batch_size: int, max_batches: int, pause: float) -> int:
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+
+    def build_ids():
+        return select(AnonUser.id).where(AnonUser.created_at < cutoff).order_by(AnonUser.id)
+
+    async def delete_batch(db, ids):
+        # задачи зарегистрированного пользователя остаются в его истории
+        await db.execute(
+            update(TranscriptionTask)
+            .where(TranscriptionTask.anon_user_id.in_(ids), TranscriptionTask.user_id.is_not(None))
+            .values(anon_user_id=None)
+        )
+        # остальные задачи удаляет ON DELETE CASCADE на стороне БД
+        await db.execute(delete(AnonUser).where(AnonUser.id.in_(ids)))
+
+    return await _delete_in_batches(build_ids, delete_batch, batch_size, max_batches, pause)
+
+
+async def purge_refresh_sessions(batch_size: int, max_batches: int, pause: float) -> int:
+    now = datetime.now(timezone.utc)
+
+    def build_ids():
+        return (
+            select(RefreshSession.id)
+            .where(or_(RefreshSession.expires_at < now, RefreshSession.is_revoked.is_(True)))
+            .order_by(RefreshSession.id)
+        )
+
+    async def delete_batch(db, ids):
+        await db.execute(delete(RefreshSession).where(RefreshSession.id.in_(ids)))
+
+    return await _delete_in_batches(build_ids, delete_batch, batch_size, max_batches, pause)
+
+
+def sweep_files(directory: Path | str, min_age: float, limit: int, keep: Callable[[str], bool] | None = None) -> int:
+    cutoff = time.time() - min_age
+    removed = 0
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return 0
+    with entries:
+        for entry in entries:
+            if removed >= limit:
+                break
+            try:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                if entry.stat(follow_symlinks=False).st_mtime > cutoff:
+                    continue
+                if keep is not None and keep(entry.name):
+                    continue
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
@@ -0,0 +1,84 @@
+# backend/core/metrics.py
+import os
+from pathlib import Path
+
+from prometheus_client import Counter, Gauge, Histogram
+
+STAGE_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5)
+
+STAGE_SECONDS = Histogram(
+    "filety_stage_seconds",
+    "Time spent in each transcription pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+QUEUE_WAIT = Histogram(
+    "filety_queue_wait_seconds",
+    "Time a task waited for an inference slot, by scheduling policy and tariff tier",
+    ["policy", "tier"],
+    buckets=STAGE_BUCKETS,
+)
+BATCH_SIZE = Histogram(
+    "filety_batch_size",
+    "Number of clips transcribed together in one micro-batch",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32),
+)
+TASK_STATUS = Counter(
+    "filety_task_status_total",
+    "Transcription task status transitions",
+    ["status"],
+)
+REALTIME_FACTOR = Histogram(
+    "filety_realtime_factor",
+    "Inference wall time divided by media duration",
+    buckets=RTF_BUCKETS,
+)
+MEDIA_SECONDS = Counter(
+    "filety_media_seconds_total",
+    "Seconds of media transcribed",
+)
+PROBES = Counter(
+    "filety_media_probe_total",
+    "Media duration probes by method",
+    ["method"],
+)
+TASKS_IN_FLIGHT = Gauge("filety_tasks_in_flight", "Tasks currently running inference")
+QUEUE_DEPTH = Gauge("filety_queue_depth", "Tasks waiting for an inference slot")
+TASKS_TRACKED = Gauge("filety_tasks_tracked", "Entries in the in-process task table")
+TEMP_DIR_BYTES = Gauge("filety_temp_dir_bytes", "Bytes stored in the task upload directory")
+UPLOADS_DIR_BYTES = Gauge("filety_resumable_uploads_bytes", "Bytes held by unfinished resumable uploads")
+RESULT_CACHE = Gauge("filety_result_cache", "Result cache counters", ["kind"])
+MAINTENANCE_SECONDS = Histogram(
+    "filety_maintenance_seconds",
+    "Duration of maintenance job runs",
+    ["job"],
+    buckets=STAGE_BUCKETS,
+)
+MAINTENANCE_ITEMS = Counter(
+    "filety_maintenance_items_total",
+    "Rows or files removed by maintenance jobs",
+    ["job"],
+)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(stage=stage).observe(seconds)
+
+
+def dir_bytes(directory: Path) -> int:
+    # с подкаталогами: недокачанные загрузки лежат в TASKS_DIR/uploads
+    total = 0
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file(follow_symlinks=False):
+                total += entry.stat(follow_symlinks=False).st_size
+            elif entry.is_dir(follow_symlinks=False):
+                total += dir_bytes(Path(entry.path))
+        except OSError:
+            pass
+    return total
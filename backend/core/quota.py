@@ -0,0 +1,137 @@
+# backend/core/quota.py
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+
+from sqlalchemy import case, func, update
+
+from backend.core.relevant_day import today_moscow
+from backend.models.anon_users import AnonUser
+from backend.models.users import User
+
+
+@dataclass(frozen=True)
+class QuotaAccount:
+    kind: str  # "user" | "anon"
+    id: int
+    limit: int | None
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, account: QuotaAccount):
+        super().__init__(f"{account.kind} daily limit exceeded")
+        self.account = account
+
+
+@dataclass
+class LedgerEntry:
+    used: int
+    reserved: int
+    day: date | None
+    expires_at: float
+
+
+# Квота в секундах: при приёме файла длительность резервируется одним условным UPDATE,
+# при завершении резерв превращается в списание, при ошибке или отмене - возвращается.
+# В памяти держим последние значения из RETURNING, чтобы отсекать заведомо
+# превышающие лимит загрузки без запроса к БД. Источник правды - всегда БД.
+class QuotaLedger:
+    def __init__(self, ttl: float, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple[str, int], LedgerEntry] = OrderedDict()
+
+    def remaining(self, account: QuotaAccount) -> int | None:
+        if account.limit is None:
+            return None
+        key = (account.kind, account.id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        used, reserved = entry.used, entry.reserved
+        # смена суток по Москве обнуляет расход пользователя; резерв держат задачи
+        # в работе, в том числе принятые вчера, поэтому он не обнуляется
+        if account.kind == "user" and entry.day != today_moscow():
+            used = 0
+        return max(0, account.limit - used - reserved)
+
+    def invalidate(self, account: QuotaAccount) -> None:
+        self._entries.pop((account.kind, account.id), None)
+
+    def _store(self, account: QuotaAccount, used: int, reserved: int, day: date | None) -> None:
+        key = (account.kind, account.id)
+        self._entries[key] = LedgerEntry(used, reserved, day, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def reserve(self, db, account: QuotaAccount, seconds: int) -> None:
+        today = today_moscow()
+        if account.kind == "user":
+            same_day = User.relevant_day == today
+            used = case((same_day, User.daily_used_time), else_=0)
+            reserved = User.daily_reserved_time
+            stmt = (
+                update(User)
+                .where(User.id == account.id)
+                .values(daily_used_time=used, daily_reserved_time=reserved + seconds, relevant_day=today)
+                .returning(User.daily_used_time, User.daily_reserved_time)
+            )
+        else:
+            used = AnonUser.daily_used_time
+            reserved = AnonUser.daily_reserved_time
+            stmt = (
+                update(AnonUser)
+                .where(AnonUser.id == account.id)
+                .values(daily_reserved_time=reserved + seconds)
+                .returning(AnonUser.daily_used_time, AnonUser.daily_reserved_time)
+            )
+            today = None
+        if account.limit is not None:
+            stmt = stmt.where(used + reserved + seconds <= account.limit)
+
+        row = (await db.execute(stmt)).first()
+        if row is None:
+            self.invalidate(account)
+            raise QuotaExceeded(account)
+        self._store(account, row.daily_used_time, row.daily_reserved_time, today)
+
+    # reserved - сколько было зарезервировано, charged - сколько списать (0 = возврат)
+    async def settle(self, db, account: QuotaAccount, reserved: int, charged: int) -> None:
+        today = today_moscow()
+        if account.kind == "user":
+            same_day = User.relevant_day == today
+            used = case((same_day, User.daily_used_time), else_=0) + charged
+            if account.limit is not None:
+                used = func.least(used, account.limit)
+            left = func.greatest(User.daily_reserved_time - reserved, 0)
+            stmt = (
+                update(User)
+                .where(User.id == account.id)
+                .values(daily_used_time=used, daily_reserved_time=left, relevant_day=today)
+                .returning(User.daily_used_time, User.daily_reserved_time)
+            )
+        else:
+            used = AnonUser.daily_used_time + charged
+            if account.limit is not None:
+                used = func.least(used, account.limit)
+            stmt = (
+                update(AnonUser)
+                .where(AnonUser.id == account.id)
+                .values(
+                    daily_used_time=used,
+                    daily_reserved_time=func.greatest(AnonUser.daily_reserved_time - reserved, 0),
+                )
+                .returning(AnonUser.daily_used_time, AnonUser.daily_reserved_time)
+            )
+            today = None
+
+        row = (await db.execute(stmt)).first()
+        if row is None:
+            self.invalidate(account)
+            return
+        self._store(account, row.daily_used_time, row.daily_reserved_time, today)
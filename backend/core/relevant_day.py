@@ -7,12 +7,9 @@ MOSCOW_TZ = ZoneInfo("Europe/Moscow")
 def today_moscow() -> date:
     return datetime.now(MOSCOW_TZ).date()
 
-def is_relevant_day(user) -> None:
-
-    today = today_moscow() 
-
-    if user.relevant_day is None or user.relevant_day != today:
-        user.daily_used_time = 0
-        user.relevant_day = today
-    
-
+# сброс суточного счётчика ленивый: в БД он обнуляется только при следующем списании,
+# а при чтении устаревший день просто считается нулём
+def used_today(daily_used_time: int | None, relevant_day: date | None) -> int:
+    if relevant_day is None or relevant_day != today_moscow():
+        return 0
+    return daily_used_time or 0
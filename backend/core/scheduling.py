@@ -0,0 +1,137 @@
+# backend/core/scheduling.py
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from backend.core.task_queue import QueuedJob
+
+# вес тарифа в fair share: сколько «секунд обслуживания» получает владелец за одну свою
+TIER_WEIGHTS = {0: 1.0, 1: 1.0, 2: 2.0, 3: 4.0, 4: 8.0}
+
+
+# Политика выбирает, какую из ждущих задач запустить следующей.
+# state - изменяемое состояние политики; order() прогоняет выбор на копии,
+# чтобы позиция в очереди и ETA совпадали с реальным порядком запуска.
+class SchedulingPolicy:
+    name = "fifo"
+
+    def __init__(self) -> None:
+        self._state = self.initial_state()
+
+    def initial_state(self) -> Any:
+        return None
+
+    def copy_state(self, state: Any) -> Any:
+        return state
+
+    def pick(self, pending: list[QueuedJob], now: float, state: Any) -> int:
+        return 0
+
+    def advance(self, state: Any, job: QueuedJob) -> Any:
+        return state
+
+    def select(self, pending: list[QueuedJob], now: float) -> QueuedJob:
+        job = pending.pop(self.pick(pending, now, self._state))
+        self._state = self.advance(self._state, job)
+        return job
+
+    # забрать конкретную задачу вне очереди выбора (добор в микропакет)
+    def take(self, pending: list[QueuedJob], job: QueuedJob) -> None:
+        pending.remove(job)
+        self._state = self.advance(self._state, job)
+
+    def order(self, pending: list[QueuedJob], now: float) -> list[QueuedJob]:
+        remaining = list(pending)
+        state = self.copy_state(self._state)
+        ordered = []
+        while remaining:
+            job = remaining.pop(self.pick(remaining, now, state))
+            state = self.advance(state, job)
+            ordered.append(job)
+        return ordered
+
+
+class FifoPolicy(SchedulingPolicy):
+    name = "fifo"
+
+
+# строгий приоритет по тарифу, внутри тарифа - по времени постановки
+class TariffPriorityPolicy(SchedulingPolicy):
+    name = "priority"
+
+    def pick(self, pending: list[QueuedJob], now: float, state: Any) -> int:
+        best = 0
+        for index, job in enumerate(pending):
+            if job.priority > pending[best].priority:
+                best = index
+        return best
+
+
+# Взвешенное справедливое разделение между владельцами (user/anon_uuid), start-time fair queueing:
+# у каждого владельца свой виртуальный счётчик обслуженных секунд, делённых на вес тарифа.
+class FairSharePolicy(SchedulingPolicy):
+    name = "fair"
+
+    def initial_state(self) -> tuple[float, dict[str, float]]:
+        return 0.0, {}
+
+    def copy_state(self, state: tuple[float, dict[str, float]]) -> tuple[float, dict[str, float]]:
+        clock, served = state
+        return clock, dict(served)
+
+    def _start_tag(self, job: QueuedJob, state: tuple[float, dict[str, float]]) -> float:
+        clock, served = state
+        return max(clock, served.get(job.owner or job.task_id, 0.0))
+
+    def pick(self, pending: list[QueuedJob], now: float, state: Any) -> int:
+        best = 0
+        best_tag = self._start_tag(pending[0], state)
+        for index, job in enumerate(pending[1:], start=1):
+            tag = self._start_tag(job, state)
+            if tag < best_tag:
+                best, best_tag = index, tag
+        return best
+
+    def advance(self, state: Any, job: QueuedJob) -> Any:
+        clock, served = state
+        start = self._start_tag(job, state)
+        served[job.owner or job.task_id] = start + job.duration_seconds / TIER_WEIGHTS.get(job.priority, 1.0)
+        # владельцы позади виртуальных часов ничем не отличаются от новых
+        for owner in [owner for owner, finish in served.items() if finish <= start]:
+            del served[owner]
+        return start, served
+
+
+# Кратчайшая задача первой; ожидание уменьшает эффективную длину на aging_rate секунд
+# за каждую секунду в очереди, так что длинный файл не голодает бесконечно.
+class ShortestJobFirstPolicy(SchedulingPolicy):
+    name = "sjf"
+
+    def __init__(self, aging_rate: float) -> None:
+        super().__init__()
+        self.aging_rate = aging_rate
+
+    def _effective(self, job: QueuedJob, now: float) -> float:
+        return job.duration_seconds - (now - job.enqueued_at) * self.aging_rate
+
+    def pick(self, pending: list[QueuedJob], now: float, state: Any) -> int:
+        best = 0
+        best_value = self._effective(pending[0], now)
+        for index, job in enumerate(pending[1:], start=1):
+            value = self._effective(job, now)
+            if value < best_value:
+                best, best_value = index, value
+        return best
+
+
+def make_policy(name: str, aging_rate: float) -> SchedulingPolicy:
+    if name == "priority":
+        return TariffPriorityPolicy()
+    if name == "fair":
+        return FairSharePolicy()
+    if name == "sjf":
+        return ShortestJobFirstPolicy(aging_rate)
+    if name != "fifo":
+        print(f"[queue] Unknown scheduling policy {name!r}, using fifo")
+    return FifoPolicy()
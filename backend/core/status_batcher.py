@@ -0,0 +1,56 @@
+# backend/core/status_batcher.py
+import asyncio
+
+from sqlalchemy import update
+
+from backend.db.session import AsyncSessionLocal
+from backend.models.transcription_tasks import TranscriptionStatus, TranscriptionTask
+
+
+# копит отметки PENDING -> IN_PROGRESS и пишет их одним UPDATE за окно
+class StatusBatcher:
+    def __init__(self, flush_interval: float) -> None:
+        self.flush_interval = flush_interval
+        self._pending: set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def mark_in_progress(self, db_task_id: int) -> None:
+        self._pending.add(db_task_id)
+        self._wakeup.set()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        ids, self._pending = self._pending, set()
+        # условие по статусу не даёт затереть COMPLETED/FAILED, если задача уже завершилась
+        async with AsyncSessionLocal() as db, db.begin():
+            await db.execute(
+                update(TranscriptionTask)
+                .where(
+                    TranscriptionTask.id.in_(ids),
+                    TranscriptionTask.status == TranscriptionStatus.PENDING,
+                )
+                .values(status=TranscriptionStatus.IN_PROGRESS)
+            )
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as exc:
+                print(f"[status] Failed to flush in-progress marks: {exc}")
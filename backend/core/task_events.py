@@ -0,0 +1,49 @@
+# backend/core/task_events.py
+import asyncio
+
+
+# Два канала на задачу: любое изменение (сегмент, позиция в очереди) - для SSE,
+# и только смена итогового статуса - для long-poll, которому сегменты не нужны.
+class TaskEvents:
+    def __init__(self) -> None:
+        self._events: dict[tuple[str, bool], asyncio.Event] = {}
+        self._waiters: dict[tuple[str, bool], int] = {}
+
+    def _wake(self, key: tuple[str, bool]) -> None:
+        event = self._events.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def notify(self, task_id: str) -> None:
+        self._wake((task_id, False))
+
+    def notify_many(self, task_ids) -> None:
+        for task_id in task_ids:
+            self.notify(task_id)
+
+    # задача завершилась (done/error): будит и тех, кто ждёт любых изменений
+    def notify_final(self, task_id: str) -> None:
+        self._wake((task_id, False))
+        self._wake((task_id, True))
+
+    async def wait(self, task_id: str, timeout: float, final_only: bool = False) -> bool:
+        key = (task_id, final_only)
+        event = self._events.setdefault(key, asyncio.Event())
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            left = self._waiters[key] - 1
+            if left:
+                self._waiters[key] = left
+            else:
+                # последний ожидающий ушёл по таймауту - событие больше никому не нужно
+                del self._waiters[key]
+                if self._events.get(key) is event:
+                    del self._events[key]
+
+
+task_events = TaskEvents()
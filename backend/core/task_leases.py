@@ -0,0 +1,85 @@
+# backend/core/task_leases.py
+import asyncio
+import os
+import socket
+import uuid
+from datetime import timedelta
+from typing import Callable
+
+from sqlalchemy import func, update
+
+from backend.db.session import AsyncSessionLocal
+from backend.models.transcription_tasks import TranscriptionStatus, TranscriptionTask
+
+# уникален для процесса: pid может повториться после перезапуска воркера
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+ACTIVE_STATUSES = [TranscriptionStatus.PENDING, TranscriptionStatus.IN_PROGRESS]
+
+
+def lease_expiry(seconds: float):
+    # время берём у БД, чтобы расхождение часов между хостами не влияло на аренду
+    return func.now() + timedelta(seconds=seconds)
+
+
+# продлевает аренду всех задач, которые ведёт этот процесс, одним UPDATE за период
+class LeaseKeeper:
+    def __init__(self, lease_seconds: float, renew_interval: float, active_ids: Callable[[], list[int]]) -> None:
+        self.lease_seconds = lease_seconds
+        self.renew_interval = renew_interval
+        self._active_ids = active_ids
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def renew(self) -> set[int]:
+        ids = self._active_ids()
+        if not ids:
+            return set()
+        async with AsyncSessionLocal() as db, db.begin():
+            renewed = (
+                await db.execute(
+                    update(TranscriptionTask)
+                    .where(
+                        TranscriptionTask.id.in_(ids),
+                        TranscriptionTask.worker_id == WORKER_ID,
+                        TranscriptionTask.status.in_(ACTIVE_STATUSES),
+                    )
+                    .values(lease_until=lease_expiry(self.lease_seconds))
+                    .returning(TranscriptionTask.id)
+                )
+            ).scalars().all()
+        lost = set(ids) - set(renewed)
+        if lost:
+            print(f"[lease] Lost lease on {len(lost)} tasks, results will not be stored")
+        return set(renewed)
+
+    async def release(self, ids: list[int]) -> None:
+        if not ids:
+            return
+        async with AsyncSessionLocal() as db, db.begin():
+            await db.execute(
+                update(TranscriptionTask)
+                .where(
+                    TranscriptionTask.id.in_(ids),
+                    TranscriptionTask.worker_id == WORKER_ID,
+                    TranscriptionTask.status.in_(ACTIVE_STATUSES),
+                )
+                .values(lease_until=func.now())
+            )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            try:
+                await self.renew()
+            except Exception as exc:
+                print(f"[lease] Failed to renew task leases: {exc}")
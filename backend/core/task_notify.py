@@ -0,0 +1,61 @@
+# backend/core/task_notify.py
+import asyncio
+from typing import Callable
+
+import asyncpg
+from sqlalchemy import func, select
+
+# payload - public_id задачи, получившей итоговый статус в БД
+TASK_FINAL_CHANNEL = "filety_task_final"
+LISTEN_RETRY_SECONDS = 5
+
+
+# внутри транзакции: уведомление уйдёт слушателям только после COMMIT
+async def publish_final(db, public_ids) -> None:
+    for public_id in public_ids:
+        if public_id:
+            await db.execute(select(func.pg_notify(TASK_FINAL_CHANNEL, public_id)))
+
+
+# Держит отдельное соединение с LISTEN и будит локальных ожидающих, когда задачу
+# завершил другой воркер. Пока соединения нет, connected=False и ждущие опрашивают БД.
+class FinalStatusListener:
+    def __init__(self, dsn: str, on_final: Callable[[str], None]) -> None:
+        self.dsn = dsn
+        self.on_final = on_final
+        self.connected = False
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        self.on_final(payload)
+
+    async def _run(self) -> None:
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(TASK_FINAL_CHANNEL, self._on_notification)
+                self.connected = True
+                await lost.wait()
+                print("[notify] LISTEN connection lost, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[notify] LISTEN failed: {exc}")
+            finally:
+                self.connected = False
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(LISTEN_RETRY_SECONDS)
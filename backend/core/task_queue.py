@@ -0,0 +1,219 @@
+# backend/core/task_queue.py
+import asyncio
+import heapq
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from backend.core.scheduling import FifoPolicy, SchedulingPolicy
+
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Transcription queue is full")
+        self.retry_after = retry_after
+
+
+@dataclass
+class QueuedJob:
+    task_id: str
+    duration_seconds: int
+    # чем больше, тем выше тариф; owner - пользователь или anon_uuid для fair share
+    priority: int = 0
+    owner: str | None = None
+    # задачи с одинаковым ключом (размер модели) можно считать одним микропакетом, None - нельзя
+    batch_key: str | None = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: float | None = None
+
+
+class TranscriptionQueue:
+    def __init__(
+        self,
+        runner: Callable[[str], Awaitable[None]],
+        slots: int,
+        max_depth: int,
+        realtime_factor: float,
+        policy: SchedulingPolicy | None = None,
+        batch_runner: Callable[[list[str]], Awaitable[None]] | None = None,
+        batch_size: int = 1,
+        batch_window: float = 0.0,
+    ) -> None:
+        self._runner = runner
+        self._batch_runner = batch_runner
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self.slots = max(1, slots)
+        self.max_depth = max(1, max_depth)
+        # секунды обработки на секунду медиа, уточняется по завершённым задачам
+        self.realtime_factor = realtime_factor
+        self.policy = policy or FifoPolicy()
+        self._pending: list[QueuedJob] = []
+        self._running: dict[str, QueuedJob] = {}
+        self._reserved = 0
+        self._available = asyncio.Semaphore(0)
+        self._arrived = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        for _ in range(self.slots):
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._running)
+
+    @property
+    def free_slots(self) -> int:
+        return max(0, self.max_depth - len(self._pending) - self._reserved)
+
+    def waiting(self) -> list[str]:
+        return [job.task_id for job in self._pending]
+
+    def _ordered(self) -> list[QueuedJob]:
+        return self.policy.order(self._pending, time.monotonic())
+
+    def reserve(self) -> None:
+        if len(self._pending) + self._reserved >= self.max_depth:
+            raise QueueFullError(self.retry_after())
+        self._reserved += 1
+
+    def release(self) -> None:
+        if self._reserved > 0:
+            self._reserved -= 1
+
+    def submit(
+        self,
+        task_id: str,
+        duration_seconds: int,
+        reserved: bool = False,
+        priority: int = 0,
+        owner: str | None = None,
+        batch_key: str | None = None,
+    ) -> None:
+        if reserved:
+            self.release()
+        elif len(self._pending) + self._reserved >= self.max_depth:
+            raise QueueFullError(self.retry_after())
+        self._pending.append(
+            QueuedJob(
+                task_id=task_id,
+                duration_seconds=duration_seconds,
+                priority=priority,
+                owner=owner,
+                batch_key=batch_key,
+            )
+        )
+        self._available.release()
+        self._arrived.set()
+
+    def cancel(self, task_id: str) -> bool:
+        for job in self._pending:
+            if job.task_id == task_id:
+                self._pending.remove(job)
+                return True
+        return False
+
+    def position(self, task_id: str) -> int | None:
+        if task_id in self._running:
+            return 0
+        for index, job in enumerate(self._ordered()):
+            if job.task_id == task_id:
+                return index + 1
+        return None
+
+    def estimated_start(self, task_id: str) -> float | None:
+        if task_id in self._running:
+            return 0.0
+        now = time.monotonic()
+        # задачи одного микропакета занимают один слот, поэтому берём не больше slots самых долгих
+        slots = heapq.nlargest(self.slots, (self._remaining(job, now) for job in self._running.values()))
+        slots.extend(0.0 for _ in range(self.slots - len(slots)))
+        heapq.heapify(slots)
+        for job in self._ordered():
+            start = heapq.heappop(slots)
+            if job.task_id == task_id:
+                return start
+            heapq.heappush(slots, start + job.duration_seconds * self.realtime_factor)
+        return None
+
+    def retry_after(self) -> int:
+        now = time.monotonic()
+        remaining = [self._remaining(job, now) for job in self._running.values()]
+        if not remaining:
+            return 1
+        return max(1, math.ceil(min(remaining)))
+
+    def _remaining(self, job: QueuedJob, now: float) -> float:
+        elapsed = now - (job.started_at or now)
+        return max(0.0, job.duration_seconds * self.realtime_factor - elapsed)
+
+    def _record_completion(self, jobs: list[QueuedJob]) -> None:
+        started = [job.started_at for job in jobs if job.started_at is not None]
+        duration = sum(job.duration_seconds for job in jobs)
+        if not started or duration <= 0:
+            return
+        observed = (time.monotonic() - min(started)) / duration
+        self.realtime_factor = 0.8 * self.realtime_factor + 0.2 * observed
+
+    def _start(self, job: QueuedJob) -> None:
+        job.started_at = time.monotonic()
+        self._running[job.task_id] = job
+
+    # Добираем к выбранной политикой короткой задаче другие с тем же ключом, пока пакет
+    # не заполнится или не истечёт окно. Добранные задачи обгоняют очередь, но пакет
+    # занимает один слот и стоит немногим дороже одиночного клипа.
+    async def _gather_batch(self, first: QueuedJob) -> list[QueuedJob]:
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while True:
+            for job in self._ordered():
+                if len(batch) >= self.batch_size:
+                    break
+                if job.batch_key == first.batch_key:
+                    self.policy.take(self._pending, job)
+                    self._start(job)
+                    batch.append(job)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or remaining <= 0:
+                return batch
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self) -> None:
+        while True:
+            await self._available.acquire()
+            # разрешение отменённой или добранной в пакет задачи остаётся в семафоре
+            if not self._pending:
+                continue
+            job = self.policy.select(self._pending, time.monotonic())
+            self._start(job)
+            jobs = [job]
+            try:
+                if self._batch_runner is not None and job.batch_key is not None and self.batch_size > 1:
+                    jobs = await self._gather_batch(job)
+                    await self._batch_runner([batched.task_id for batched in jobs])
+                else:
+                    await self._runner(job.task_id)
+            except Exception as exc:
+                print(f"[queue] Task {job.task_id} failed: {exc}")
+            finally:
+                for finished in jobs:
+                    self._running.pop(finished.task_id, None)
+                self._record_completion(jobs)
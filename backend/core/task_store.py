@@ -0,0 +1,93 @@
+# backend/core/task_store.py
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import select
+
+from backend.db.session import AsyncSessionLocal
+from backend.models.transcription_tasks import TranscriptionStatus, TranscriptionTask
+
+API_STATUS = {
+    TranscriptionStatus.PENDING: "processing",
+    TranscriptionStatus.IN_PROGRESS: "processing",
+    TranscriptionStatus.COMPLETED: "done",
+    TranscriptionStatus.FAILED: "error",
+}
+
+
+@dataclass
+class TaskState:
+    public_id: str
+    status: str
+    result: str | None = None
+    error: str | None = None
+    db_task_id: int | None = None
+
+    @property
+    def is_final(self) -> bool:
+        return self.status in ("done", "error")
+
+
+class TaskStore(ABC):
+    @abstractmethod
+    async def get(self, public_id: str) -> TaskState | None:
+        ...
+
+    def remember(self, state: TaskState) -> None:
+        pass
+
+    def invalidate(self, public_id: str) -> None:
+        pass
+
+
+class DbTaskStore(TaskStore):
+    def __init__(self, cache_size: int, final_ttl: float, active_ttl: float) -> None:
+        self.cache_size = cache_size
+        self.final_ttl = final_ttl
+        # незавершённые задачи может обновить другой воркер, поэтому кэшируем их ненадолго
+        self.active_ttl = active_ttl
+        self._cache: OrderedDict[str, tuple[float, TaskState]] = OrderedDict()
+
+    async def get(self, public_id: str) -> TaskState | None:
+        cached = self._cache.get(public_id)
+        if cached is not None:
+            expires_at, state = cached
+            if expires_at > time.monotonic():
+                self._cache.move_to_end(public_id)
+                return state
+            del self._cache[public_id]
+
+        async with AsyncSessionLocal() as db:
+            row = (
+                await db.execute(
+                    select(
+                        TranscriptionTask.id,
+                        TranscriptionTask.status,
+                        TranscriptionTask.transcription_text,
+                        TranscriptionTask.error,
+                    ).where(TranscriptionTask.public_id == public_id)
+                )
+            ).first()
+        if row is None:
+            return None
+        state = TaskState(
+            public_id=public_id,
+            status=API_STATUS.get(row.status, row.status),
+            result=row.transcription_text,
+            error=row.error,
+            db_task_id=row.id,
+        )
+        self.remember(state)
+        return state
+
+    def remember(self, state: TaskState) -> None:
+        ttl = self.final_ttl if state.is_final else self.active_ttl
+        self._cache[state.public_id] = (time.monotonic() + ttl, state)
+        self._cache.move_to_end(state.public_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, public_id: str) -> None:
+        self._cache.pop(public_id, None)
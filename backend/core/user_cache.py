@@ -0,0 +1,66 @@
+# backend/core/user_cache.py
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from backend.core.config import get_settings
+from backend.core.relevant_day import used_today
+
+
+# неизменяемый снимок пользователя для read-path: не привязан к сессии и не пишет в БД
+@dataclass(frozen=True)
+class UserSnapshot:
+    id: int
+    email: str
+    created_at: datetime
+    tariff_plan: int
+    stored_used_time: int
+    relevant_day: date | None
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            created_at=user.created_at,
+            tariff_plan=user.tariff_plan,
+            stored_used_time=user.daily_used_time or 0,
+            relevant_day=user.relevant_day,
+        )
+
+    @property
+    def daily_used_time(self) -> int:
+        return used_today(self.stored_used_time, self.relevant_day)
+
+
+class UserCache:
+    def __init__(self, ttl: float, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: OrderedDict[int, tuple[float, UserSnapshot]] = OrderedDict()
+
+    def get(self, user_id: int) -> UserSnapshot | None:
+        item = self._items.get(user_id)
+        if item is None:
+            return None
+        expires_at, snapshot = item
+        if expires_at <= time.monotonic():
+            del self._items[user_id]
+            return None
+        self._items.move_to_end(user_id)
+        return snapshot
+
+    def put(self, snapshot: UserSnapshot) -> None:
+        self._items[snapshot.id] = (time.monotonic() + self.ttl, snapshot)
+        self._items.move_to_end(snapshot.id)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    # вызывать при любом изменении квоты или тарифа пользователя
+    def invalidate(self, user_id: int) -> None:
+        self._items.pop(user_id, None)
+
+
+settings = get_settings()
+user_cache = UserCache(settings.user_cache_ttl, settings.user_cache_size)
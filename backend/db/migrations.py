@@ -0,0 +1,54 @@
+# backend/db/migrations.py
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# create_all не меняет уже существующие таблицы, поэтому новые колонки и индексы
+# докатываем идемпотентными DDL при старте
+SCHEMA_UPGRADES: list[str] = [
+    "ALTER TABLE transcription_tasks ADD COLUMN IF NOT EXISTS public_id VARCHAR(32)",
+    "ALTER TABLE transcription_tasks ADD COLUMN IF NOT EXISTS error TEXT",
+    "ALTER TABLE transcription_tasks ADD COLUMN IF NOT EXISTS duration_seconds INTEGER",
+    "ALTER TABLE transcription_tasks ADD COLUMN IF NOT EXISTS input_path VARCHAR(512)",
+    "ALTER TABLE transcription_tasks ADD COLUMN IF NOT EXISTS media_type VARCHAR(128)",
+    "ALTER TABLE transcription_tasks ADD COLUMN IF NOT EXISTS model_size VARCHAR(32)",
+    "ALTER TABLE transcription_tasks ADD COLUMN IF NOT EXISTS quota_reserved INTEGER",
+    "ALTER TABLE transcription_tasks ADD COLUMN IF NOT EXISTS worker_id VARCHAR(128)",
+    "ALTER TABLE transcription_tasks ADD COLUMN IF NOT EXISTS lease_until TIMESTAMPTZ",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS daily_reserved_time INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE anon_users ADD COLUMN IF NOT EXISTS daily_reserved_time INTEGER NOT NULL DEFAULT 0",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_transcription_tasks_public_id "
+    "ON transcription_tasks (public_id)",
+    "CREATE INDEX IF NOT EXISTS ix_transcription_tasks_user_created "
+    "ON transcription_tasks (user_id, created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_transcription_tasks_anon_created "
+    "ON transcription_tasks (anon_user_id, created_at DESC, id DESC)",
+    # восстановление ищет только активные задачи с истёкшей арендой
+    "CREATE INDEX IF NOT EXISTS ix_transcription_tasks_active_lease "
+    "ON transcription_tasks (lease_until) WHERE status IN ('pending', 'in_progress')",
+    # старые базы создавались без ON DELETE CASCADE; пересоздаём FK только если нужно
+    """
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conname = 'transcription_tasks_anon_user_id_fkey' AND confdeltype <> 'c'
+        ) THEN
+            ALTER TABLE transcription_tasks
+                DROP CONSTRAINT transcription_tasks_anon_user_id_fkey,
+                ADD CONSTRAINT transcription_tasks_anon_user_id_fkey
+                    FOREIGN KEY (anon_user_id) REFERENCES anon_users (id) ON DELETE CASCADE;
+        END IF;
+    END $$
+    """,
+]
+
+
+SCHEMA_LOCK_ID = 727001
+
+
+def upgrade_schema(engine: Engine) -> None:
+    with engine.begin() as conn:
+        # несколько воркеров uvicorn стартуют одновременно
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": SCHEMA_LOCK_ID})
+        for statement in SCHEMA_UPGRADES:
+            conn.execute(text(statement))
@@ -1,5 +1,6 @@
 # backend/db/session.py
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from backend.core.config import get_settings
@@ -8,12 +9,33 @@ settings = get_settings()
 
 engine = create_engine(
     settings.database_url, 
-    pool_pre_ping=True)
+    pool_pre_ping=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    connect_args={"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"},
+)
 
 SessionLocal = sessionmaker(
     autocommit=False, 
     autoflush=False, 
     bind=engine)
 
-Base = declarative_base()
+async_engine = create_async_engine(
+    settings.async_database_url,
+    pool_pre_ping=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    connect_args={"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}},
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
+Base = declarative_base()
@@ -1,13 +1,27 @@
 # backend/fastapi_main.py
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Depends, Header, Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from slowapi.middleware import SlowAPIMiddleware
 
 import asyncio
-from backend.transcription import which_file, TranscriptionError
+import hashlib
+import json
+import secrets
+from backend.transcription import (
+    which_file,
+    transcribe_batch,
+    batch_supported,
+    TranscriptionError,
+    TRANSCRIBE_OPTIONS,
+    PCM_MEDIA_TYPE,
+    WHISPER_WINDOW_SECONDS,
+    model_registry,
+    files_dir,
+)
 import os
 import uuid
 from pathlib import Path
@@ -19,19 +33,43 @@ from backend.api.v1.auth_anonymous import router as auth_anonymous_router
 from backend.api.v1.auth_users import router as auth_users_router
 from backend.api.v1.transcriptions import router as transcriptions_router
 
-import subprocess
-from backend.db.session import SessionLocal
+import time
+from backend.db.session import AsyncSessionLocal
 from backend.models.transcription_tasks import TranscriptionStatus, TranscriptionTask
 from backend.models.anon_users import AnonUser
 import math
 from uuid import UUID as UUID_cls
-from backend.core.limits import DAILY_LIMIT_ANON_USER, get_daily_limit_for_user
-from sqlalchemy import select, delete
+from backend.core.limits import (
+    DAILY_LIMIT_ANON_USER,
+    PRIORITY_ANON_USER,
+    PRIORITY_TIER_NAMES,
+    get_daily_limit_for_user,
+    get_model_size_for_user,
+    get_priority_for_user,
+)
+from backend.core.scheduling import make_policy
+from sqlalchemy import func, or_, select, update
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
 from fastapi.middleware.cors import CORSMiddleware
-from backend.models.users import User
 from backend.api.v1.auth_users import get_current_user_optional
+from backend.core.config import get_settings
+from backend.core.task_queue import TranscriptionQueue, QueueFullError
+from backend.inference_pool import InferencePool
+from backend.core.task_events import task_events
+from backend.core.task_notify import FinalStatusListener, publish_final
+from backend.core.result_cache import ResultCache
+from backend.media_probe import probe_media_seconds
+from backend.transcript_formats import pack_segments
+from backend.core import metrics, maintenance
+from backend.core.status_batcher import StatusBatcher
+from backend.core.task_leases import ACTIVE_STATUSES, WORKER_ID, LeaseKeeper, lease_expiry
+from backend.core.task_store import DbTaskStore, TaskState
+from backend.core.user_cache import UserSnapshot, user_cache
+from backend.core.quota import QuotaAccount, QuotaExceeded, QuotaLedger
+from backend.db.migrations import upgrade_schema
+from backend.resumable_uploads import ResumableUploads, UploadError
+from backend.streaming_ingest import IngestTooLarge, ingest
+from backend.schemas.uploads import UploadCreateRequest, UploadCreateResponse, UploadFinalizeRequest
 
 MB = 1024 * 1024
 
@@ -39,6 +77,42 @@ TASKS_DIR = Path("/root/filety/backend/tasks")
 TASKS_DIR.mkdir(parents=True, exist_ok=True)
 TASKS: dict[str, dict] = {}
 
+SSE_KEEPALIVE_SECONDS = 15
+LONG_POLL_MAX_SECONDS = 30
+# чужие задачи (другой воркер) не получают in-process уведомлений, их перечитываем из БД
+REMOTE_POLL_SECONDS = 2
+STATUS_FLUSH_SECONDS = 0.5
+
+settings = get_settings()
+
+resumable_uploads = ResumableUploads(
+    TASKS_DIR / "uploads",
+    max_bytes=settings.upload_max_mb * MB,
+    expire_seconds=settings.upload_expire_seconds,
+)
+
+ingest_decoders = asyncio.Semaphore(settings.ingest_max_decoders)
+
+result_cache: ResultCache | None = None
+if settings.result_cache_enabled:
+    result_cache = ResultCache(settings.result_cache_dir, settings.result_cache_max_mb * MB)
+
+# TASKS хранит только задачи этого процесса (сегменты для SSE, прогресс);
+# источник правды по статусу — таблица transcription_tasks
+task_store = DbTaskStore(
+    cache_size=settings.task_state_cache_size,
+    final_ttl=settings.task_state_final_ttl,
+    active_ttl=settings.task_state_active_ttl,
+)
+
+inference_pool: InferencePool | None = None
+if settings.transcription_executor == "process":
+    inference_pool = InferencePool(
+        workers=settings.transcription_process_workers,
+        cpu_threads=settings.transcription_process_cpu_threads,
+        memory_budget_mb=settings.transcription_process_memory_mb,
+    )
+
 limiter = Limiter(key_func = get_remote_address)
 app = FastAPI(title="Failety API")
 
@@ -53,6 +127,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Upload-Offset", "Upload-Length", "Location", "Retry-After", "X-Next-Cursor"],
 )
 
 @app.exception_handler(RateLimitExceeded)
@@ -67,6 +142,19 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    metrics.TASKS_IN_FLIGHT.set(transcription_queue.in_flight)
+    metrics.QUEUE_DEPTH.set(transcription_queue.depth)
+    metrics.TASKS_TRACKED.set(len(TASKS))
+    metrics.TEMP_DIR_BYTES.set(await asyncio.to_thread(metrics.dir_bytes, TASKS_DIR))
+    metrics.UPLOADS_DIR_BYTES.set(await asyncio.to_thread(metrics.dir_bytes, resumable_uploads.directory))
+    if result_cache is not None:
+        for kind, value in result_cache.stats().items():
+            metrics.RESULT_CACHE.labels(kind=kind).set(value)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 def _safe_remove(path: str | None):
     if not path:
         return
@@ -77,233 +165,902 @@ def _safe_remove(path: str | None):
         pass
 
 
-async def _save_upload_to_temp(file: UploadFile, task_id: str) -> str:
+async def _save_upload_to_temp(file: UploadFile, task_id: str) -> tuple[str, str]:
     suffix = os.path.splitext(file.filename or "")[1] or ".tmp"
     temp_path = TASKS_DIR / f"{task_id}{suffix}"
+    digest = hashlib.sha256()
     with open(temp_path, "wb") as f:
         while True:
             chunk = await file.read(2 * MB)
             if not chunk:
                 break
+            digest.update(chunk)
             f.write(chunk)
-    return str(temp_path)
+    return str(temp_path), digest.hexdigest()
 
-def get_media_seconds(path: str) -> int:
-    try:
-        result = subprocess.run(
-            [
-                "ffprobe",
-                "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                path,
-            ],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=True,
+
+def _result_cache_key(content_hash: str, model_size: str | None, duration_seconds: int) -> str:
+    params = {
+        "model": model_registry.resolve(model_size),
+        "beam_size": TRANSCRIBE_OPTIONS["beam_size"],
+        "language": TRANSCRIBE_OPTIONS["language"],
+        "vad": TRANSCRIBE_OPTIONS["vad_filter"],
+        "words": TRANSCRIBE_OPTIONS["word_timestamps"],
+    }
+    # микропакет идёт без VAD, его результат не должен выдаваться за обычный
+    if _batch_key(duration_seconds, model_size) is not None:
+        params.update(vad=False, mode="batched")
+    return ResultCache.make_key(content_hash, **params)
+
+async def _run_inference(
+    source,
+    media_type: str,
+    model_size: str | None,
+    duration_hint: float | None = None,
+    on_segment=None,
+    stage_times: dict | None = None,
+):
+    if inference_pool is not None:
+        return await inference_pool.run(
+            source, media_type, model_size, duration_hint, on_segment, stage_times
         )
-        duration_str = result.stdout.strip()
-        if not duration_str:
-            raise ValueError("Negative duration from ffprobe")
-        duration = float(duration_str)
-        if duration < 0:
-            raise ValueError("Negative duration from ffprobe")
-        return max(1, math.ceil(duration))
-    except Exception as exc:
-        raise RuntimeError(f"Failed to get media duration: {exc}") from exc
-    
-async def _process_task(task_id: str):
+    return await asyncio.to_thread(
+        which_file,
+        source,
+        media_type=media_type,
+        model_size=model_size,
+        duration_hint=duration_hint,
+        on_segment=on_segment,
+        stage_times=stage_times,
+    )
+
+
+def _append_segment(task_id: str, segment: dict) -> None:
+    task = TASKS.get(task_id)
+    if task is None:
+        return
+    task["segments"].append(segment)
+    duration = task.get("duration_seconds") or 0
+    if duration > 0:
+        task["progress"] = min(100.0, round(segment["end"] / duration * 100, 1))
+    task_events.notify(task_id)
+
+
+status_batcher = StatusBatcher(STATUS_FLUSH_SECONDS)
+
+
+quota_ledger = QuotaLedger(settings.quota_ledger_ttl, settings.quota_ledger_size)
+
+def _quota_account(user_id: int | None, anon_user_id: int | None, user_limit: int | None) -> QuotaAccount:
+    if user_id is not None:
+        return QuotaAccount("user", user_id, user_limit)
+    return QuotaAccount("anon", anon_user_id, DAILY_LIMIT_ANON_USER)
+
+
+async def _settle_usage(
+    db,
+    user_id: int | None,
+    anon_user_id: int | None,
+    user_limit: int | None,
+    reserved: int,
+    charged: int,
+) -> None:
+    account = _quota_account(user_id, anon_user_id, user_limit)
+    await quota_ledger.settle(db, account, reserved, charged)
+    if account.kind == "user":
+        user_cache.invalidate(user_id)
+        # анонимный счётчик того же браузера растёт вместе с пользовательским
+        if charged and anon_user_id is not None:
+            await quota_ledger.settle(db, _quota_account(None, anon_user_id, None), 0, charged)
+
+
+async def _complete_task(task_info: dict, text: str) -> None:
+    async with AsyncSessionLocal() as db, db.begin():
+        # условие по статусу: отменённая задача не должна списать квоту
+        updated = (
+            await db.execute(
+                update(TranscriptionTask)
+                .where(
+                    TranscriptionTask.id == task_info["db_task_id"],
+                    TranscriptionTask.status.in_(ACTIVE_STATUSES),
+                    # задачу с истёкшей арендой мог забрать другой воркер - пишет только владелец
+                    TranscriptionTask.worker_id == WORKER_ID,
+                )
+                .values(
+                    status=TranscriptionStatus.COMPLETED,
+                    transcription_text=text,
+                    transcription_json=pack_segments(task_info["segments"]),
+                )
+                .returning(TranscriptionTask.public_id)
+            )
+        ).first()
+        if updated is None:
+            return
+        await publish_final(db, [updated.public_id])
+        await _settle_usage(
+            db,
+            task_info.get("user_id"),
+            task_info.get("anon_user_id"),
+            task_info.get("user_limit"),
+            task_info.get("quota_reserved") or 0,
+            task_info.get("duration_seconds") or 0,
+        )
+
+
+async def _fail_task(task_info: dict, error: str) -> None:
+    async with AsyncSessionLocal() as db, db.begin():
+        updated = (
+            await db.execute(
+                update(TranscriptionTask)
+                .where(
+                    TranscriptionTask.id == task_info["db_task_id"],
+                    TranscriptionTask.status.in_(ACTIVE_STATUSES),
+                    TranscriptionTask.worker_id == WORKER_ID,
+                )
+                .values(status=TranscriptionStatus.FAILED, error=error)
+                .returning(TranscriptionTask.public_id)
+            )
+        ).first()
+        if updated is not None:
+            await publish_final(db, [updated.public_id])
+        if updated is not None and task_info.get("quota_reserved"):
+            await _settle_usage(
+                db,
+                task_info.get("user_id"),
+                task_info.get("anon_user_id"),
+                task_info.get("user_limit"),
+                task_info["quota_reserved"],
+                0,
+            )
+
+
+def _task_entry(input_path: str, media: str, **fields) -> dict:
+    entry = {
+        "status": "processing",
+        "input_path": input_path,
+        "media": media,
+        "result": None,
+        "error": None,
+        "cleanup": [],
+        "segments": [],
+        "progress": 0.0,
+        "enqueued_at": time.monotonic(),
+    }
+    entry.update(fields)
+    return entry
+
+
+def _forget_local_task(task_id: str) -> None:
+    # завершённая задача остаётся в памяти ненадолго, дальше статус читается из task_store
+    loop = asyncio.get_running_loop()
+    loop.call_later(settings.task_local_ttl, TASKS.pop, task_id, None)
+
+
+def _begin_task(task_id: str) -> dict | None:
     task_info = TASKS.get(task_id)
     if not task_info:
+        return None
+    queue_wait = time.monotonic() - task_info["enqueued_at"]
+    metrics.observe_stage("queue_wait", queue_wait)
+    metrics.QUEUE_WAIT.labels(
+        policy=transcription_queue.policy.name,
+        tier=PRIORITY_TIER_NAMES.get(task_info.get("priority", 0), "anon"),
+    ).observe(queue_wait)
+    # у всех ожидающих сдвинулась позиция в очереди
+    task_events.notify(task_id)
+    task_events.notify_many(transcription_queue.waiting())
+    metrics.TASK_STATUS.labels(status=TranscriptionStatus.IN_PROGRESS).inc()
+    if task_info.get("db_task_id") is not None:
+        status_batcher.mark_in_progress(task_info["db_task_id"])
+    return task_info
+
+
+async def _task_succeeded(task_id: str, text: str, inference_seconds: float) -> None:
+    task_info = TASKS[task_id]
+    duration_seconds = task_info.get("duration_seconds")
+    if duration_seconds:
+        metrics.REALTIME_FACTOR.observe(inference_seconds / duration_seconds)
+        metrics.MEDIA_SECONDS.inc(duration_seconds)
+    task_info["result"] = text
+    task_info["progress"] = 100.0
+    task_info["status"] = "done"
+
+    cache_key = task_info.get("cache_key")
+    if result_cache is not None and cache_key is not None:
+        try:
+            await asyncio.to_thread(
+                result_cache.put,
+                cache_key,
+                {"text": text, "segments": task_info["segments"]},
+            )
+        except OSError as exc:
+            print(f"[cache] Failed to store result for task {task_id}: {exc}")
+
+    if task_info.get("db_task_id") is not None:
+        commit_started = time.perf_counter()
+        await _complete_task(task_info, text)
+        metrics.observe_stage("db_commit", time.perf_counter() - commit_started)
+    metrics.TASK_STATUS.labels(status=TranscriptionStatus.COMPLETED).inc()
+
+
+async def _task_failed(task_id: str, error: str) -> None:
+    task_info = TASKS[task_id]
+    task_info["error"] = error
+    task_info["status"] = "error"
+    metrics.TASK_STATUS.labels(status=TranscriptionStatus.FAILED).inc()
+    if task_info.get("db_task_id") is not None:
+        await _fail_task(task_info, error)
+
+
+def _end_task(task_id: str) -> None:
+    task = TASKS[task_id]
+    _safe_remove(task["input_path"])
+    for f in task["cleanup"]:
+        _safe_remove(f)
+    if task["status"] in ("done", "error"):
+        task_store.remember(
+            TaskState(
+                public_id=task_id,
+                status=task["status"],
+                result=task["result"],
+                error=task["error"],
+                db_task_id=task.get("db_task_id"),
+            )
+        )
+        task_events.notify_final(task_id)
+    else:
+        task_events.notify(task_id)
+    _forget_local_task(task_id)
+
+
+def _abandon_task(task_id: str) -> None:
+    # Остановка воркера посреди задачи: входной файл и строку в БД не трогаем,
+    # после истечения аренды задачу перезапустит восстановление.
+    TASKS.pop(task_id, None)
+
+
+async def _process_task(task_id: str):
+    task_info = _begin_task(task_id)
+    if task_info is None:
         return
-    input_path = task_info["input_path"]
-    media = task_info["media"]
-    db_task_id: int | None = task_info.get("db_task_id")
-    duration_seconds: int | None = task_info.get("duration_seconds")
+    loop = asyncio.get_running_loop()
+    stage_times: dict = {}
+    cancelled = False
+
+    def on_segment(segment: dict) -> None:
+        loop.call_soon_threadsafe(_append_segment, task_id, segment)
+
     try:
-        if db_task_id is not None:
-            db = SessionLocal()
-            try:
-                db_task = db.get(TranscriptionTask, db_task_id)
-                if db_task:
-                    db_task.status = TranscriptionStatus.IN_PROGRESS
-                    db.commit()
-            finally:
-                db.close()
-        
-        text, cleanup = await asyncio.to_thread(which_file, input_path, media_type=media)
-        TASKS[task_id]["cleanup"].extend(cleanup)
-        TASKS[task_id]["result"] = text
-        TASKS[task_id]["status"] = "done"
-
-        if db_task_id is not None:
-            db = SessionLocal()
-            try:
-                db_task = db.get(TranscriptionTask, db_task_id)
-                if db_task:
-                    db_task.status = TranscriptionStatus.COMPLETED
-                    db_task.transcription_text = text
-                    
-                    if duration_seconds is not None and duration_seconds > 0:
-                        if db_task.user_id is not None:
-                            user = db.get(User, db_task.user_id)
-                            if user:
-                                user.daily_used_time = (user.daily_used_time or 0) + duration_seconds
-
-                        if db_task.anon_user_id is not None:
-                            anon_user = db.get(AnonUser, db_task.anon_user_id)
-                            if anon_user:
-                                current_used = anon_user.daily_used_time or 0
-                                new_used = current_used + duration_seconds
-                                if new_used > DAILY_LIMIT_ANON_USER:
-                                    new_used = DAILY_LIMIT_ANON_USER
-                                anon_user.daily_used_time = new_used
-                    db.commit()
-            finally:
-                db.close()
+        inference_started = time.perf_counter()
+        text, cleanup = await _run_inference(
+            task_info["input_path"],
+            task_info["media"],
+            task_info.get("model_size"),
+            task_info.get("duration_seconds"),
+            on_segment,
+            stage_times,
+        )
+        inference_total = time.perf_counter() - inference_started
+        for stage in ("audio_extraction", "inference"):
+            if stage in stage_times:
+                metrics.observe_stage(stage, stage_times[stage])
+        task_info["cleanup"].extend(cleanup)
+        await _task_succeeded(task_id, text, inference_total)
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
     except TranscriptionError as exc:
-        TASKS[task_id]["cleanup"].extend(exc.cleanup)
-        TASKS[task_id]["error"] = str(exc)
-        TASKS[task_id]["status"] = "error"
-
-        if db_task_id is not None:
-            db = SessionLocal()
-            try:
-                db_task = db.get(TranscriptionTask, db_task_id)
-                if db_task: 
-                    db_task.status = TranscriptionStatus.FAILED
-                    db.commit()
-            finally:
-                db.close() 
+        task_info["cleanup"].extend(exc.cleanup)
+        await _task_failed(task_id, str(exc))
     except Exception as exc:
-        TASKS[task_id]["error"] = f"Unhandled: {exc}"
-        TASKS[task_id]["status"] = "error"
+        await _task_failed(task_id, f"Unhandled: {exc}")
+    finally:
+        if cancelled:
+            _abandon_task(task_id)
+        else:
+            _end_task(task_id)
+
 
-        if db_task_id is not None:
-            db = SessionLocal()
+# Микропакет коротких клипов: один вызов модели на всех, результаты раздаются по задачам.
+async def _process_batch(task_ids: list[str]):
+    infos = [(task_id, task_info) for task_id in task_ids if (task_info := _begin_task(task_id)) is not None]
+    if not infos:
+        return
+    metrics.BATCH_SIZE.observe(len(infos))
+    clips = [(task_info["input_path"], task_info["media"]) for _, task_info in infos]
+    model_size = infos[0][1].get("model_size")
+    stage_times: dict = {}
+    cancelled = False
+    try:
+        inference_started = time.perf_counter()
+        try:
+            if inference_pool is not None:
+                results = await inference_pool.run_batch(clips, model_size, stage_times)
+            else:
+                results = await asyncio.to_thread(transcribe_batch, clips, model_size, stage_times)
+        except Exception as exc:
+            for task_id, _ in infos:
+                await _task_failed(task_id, f"Unhandled: {exc}")
+            return
+        inference_total = time.perf_counter() - inference_started
+        for stage in ("audio_extraction", "inference"):
+            if stage in stage_times:
+                metrics.observe_stage(stage, stage_times[stage])
+
+        batch_seconds = sum(task_info.get("duration_seconds") or 0 for _, task_info in infos) or 1
+        for (task_id, task_info), (text, segments, error) in zip(infos, results):
             try:
-                db_task = db.get(TranscriptionTask, db_task_id)
-                if db_task:
-                    db_task.status = TranscriptionStatus.FAILED
-                    db.commit()
-            finally:
-                db.close()
+                if error is not None:
+                    await _task_failed(task_id, error)
+                    continue
+                for segment in segments:
+                    _append_segment(task_id, segment)
+                # время пакета делим между клипами пропорционально длительности
+                share = (task_info.get("duration_seconds") or 0) / batch_seconds
+                await _task_succeeded(task_id, text, inference_total * share)
+            except Exception as exc:
+                await _task_failed(task_id, f"Unhandled: {exc}")
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
     finally:
-        _safe_remove(input_path)
-        for f in TASKS[task_id]["cleanup"]:
-            _safe_remove(f)
+        for task_id, _ in infos:
+            if cancelled and TASKS[task_id]["status"] == "processing":
+                _abandon_task(task_id)
+            else:
+                _end_task(task_id)
+
+
+def _batch_key(duration_seconds: int, model_size: str | None) -> str | None:
+    if (
+        not settings.batch_inference_enabled
+        or not batch_supported()
+        or duration_seconds > min(settings.batch_max_clip_seconds, WHISPER_WINDOW_SECONDS)
+    ):
+        return None
+    return model_registry.resolve(model_size)
+
+
+transcription_queue = TranscriptionQueue(
+    _process_task,
+    slots=settings.transcription_slots,
+    max_depth=settings.transcription_queue_max,
+    realtime_factor=settings.transcription_realtime_factor,
+    policy=make_policy(settings.transcription_policy, settings.transcription_sjf_aging_rate),
+    batch_runner=_process_batch,
+    batch_size=settings.batch_max_size,
+    batch_window=settings.batch_window_ms / 1000,
+)
+
+
+def _queue_owner(user_id: int | None, anon_user_id: int | None) -> str:
+    return f"user:{user_id}" if user_id is not None else f"anon:{anon_user_id}"
+
+
+def _queue_full_response(exc: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Transcription queue is full, try again later",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 @app.post("/translate/start")
 async def translate_start(
     file: UploadFile = File(...),
     anon_uuid: str | None = Form(None),
-    current_user: User | None = Depends(get_current_user_optional)
+    current_user: UserSnapshot | None = Depends(get_current_user_optional)
 ):
     if anon_uuid is None:
         raise HTTPException(
             status_code=400, 
             detail="anon_uuid is required"
             )
-    
+
+    try:
+        transcription_queue.reserve()
+    except QueueFullError as exc:
+        raise _queue_full_response(exc)
+
+    try:
+        return await _admit_upload(file, anon_uuid, current_user)
+    except BaseException:
+        transcription_queue.release()
+        raise
+
+
+async def _admit_upload(file: UploadFile, anon_uuid: str, current_user: UserSnapshot | None) -> dict:
     task_id = uuid.uuid4().hex
 
+    save_started = time.perf_counter()
     try:
-        input_path = await _save_upload_to_temp(file, task_id)
+        input_path, content_hash = await _save_upload_to_temp(file, task_id)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Failed to save file: {exc}")
-    
+    metrics.observe_stage("upload_save", time.perf_counter() - save_started)
+
+    return await _admit_saved(
+        task_id, input_path, content_hash, file.content_type or "", anon_uuid, current_user
+    )
+
+
+async def _probe_duration(input_path: str, known_duration: int | None = None) -> tuple[int, str, float]:
+    probe_started = time.perf_counter()
     try:
-        duration_seconds = get_media_seconds(input_path)
+        if known_duration is not None:
+            duration_seconds, probe_method = known_duration, "stream"
+        else:
+            duration_seconds, probe_method = await probe_media_seconds(
+                input_path, settings.media_probe_timeout_seconds
+            )
     except Exception as exc:
         _safe_remove(input_path)
         raise HTTPException(status_code=400, detail=f"Failed to get media duration: {exc}")
-    
+    probe_seconds = time.perf_counter() - probe_started
+    metrics.observe_stage("probe", probe_seconds)
+    metrics.PROBES.labels(method=probe_method).inc()
+    return duration_seconds, probe_method, round(probe_seconds * 1000, 1)
+
+
+async def _admit_saved(
+    task_id: str,
+    input_path: str,
+    content_hash: str,
+    media_type: str,
+    anon_uuid: str,
+    current_user: UserSnapshot | None,
+    known_duration: int | None = None,
+) -> dict:
+    duration_seconds, probe_method, probe_ms = await _probe_duration(input_path, known_duration)
+
     try:
         anon_user_obj = UUID_cls(anon_uuid)
     except ValueError:
         _safe_remove(input_path)
         raise HTTPException(status_code=400, detail="Invalid anon_uuid format")
-    db = SessionLocal()
+
+    model_size = get_model_size_for_user(current_user)
+    cache_key: str | None = None
+    cached: dict | None = None
+    if result_cache is not None:
+        cache_key = _result_cache_key(content_hash, model_size, duration_seconds)
+        cached = await asyncio.to_thread(result_cache.get, cache_key)
+
+    user_limit: int | None = None
+    if current_user is not None:
+        user_limit = get_daily_limit_for_user(current_user)
+        # заведомое превышение отсекаем по леджеру, не открывая транзакцию
+        remaining = quota_ledger.remaining(QuotaAccount("user", current_user.id, user_limit))
+        if remaining is not None and duration_seconds > remaining:
+            _safe_remove(input_path)
+            raise HTTPException(status_code=400, detail="User daily limit exceeded")
+
+    charge_cached = cached is not None and settings.result_cache_quota_policy == "charge"
+    db = AsyncSessionLocal()
     anon_user: AnonUser | None = None
     db_task: TranscriptionTask | None = None
+    account: QuotaAccount | None = None
     try:
         stmt = select(AnonUser).where(AnonUser.uuid == anon_user_obj)
-        anon_user = db.execute(stmt).scalars().first()
+        anon_user = (await db.execute(stmt)).scalars().first()
 
         if anon_user is None:
             anon_user = AnonUser(uuid=anon_user_obj)
             db.add(anon_user)
-            db.commit()
-            db.refresh(anon_user)
-        used_anon = anon_user.daily_used_time or 0
-
-        if current_user is not None:
-            user_limit = get_daily_limit_for_user(current_user)
-            used_user = current_user.daily_used_time or 0
-
-            if user_limit is not None:
-                remaining = user_limit - used_user
-                if remaining <= 0 or duration_seconds > remaining:
-                    _safe_remove(input_path)
-                    raise HTTPException(
-                        status_code=400, 
-                        detail="User daily limit exceeded"
-                        )
-        else:
-            remaining_anon = DAILY_LIMIT_ANON_USER - used_anon
-            if remaining_anon <= 0 or duration_seconds > remaining_anon:
+            await db.commit()
+            await db.refresh(anon_user)
+
+        account = _quota_account(
+            current_user.id if current_user is not None else None, anon_user.id, user_limit
+        )
+        if cached is None or charge_cached:
+            # атомарная проверка лимита: параллельные загрузки не могут превысить его вместе
+            try:
+                await quota_ledger.reserve(db, account, duration_seconds)
+            except QuotaExceeded:
                 _safe_remove(input_path)
                 raise HTTPException(
-                    status_code=400, 
-                    detail="Anon user daily limit exceeded"
+                    status_code=400,
+                    detail="User daily limit exceeded" if account.kind == "user" else "Anon user daily limit exceeded"
                     )
 
-        
         db_task = TranscriptionTask(
+            public_id = task_id,
+            duration_seconds = duration_seconds,
+            input_path = input_path,
+            media_type = media_type,
+            model_size = model_size,
+            quota_reserved = duration_seconds if cached is None else None,
             anon_user_id = anon_user.id,
             user_id = current_user.id if current_user is not None else None,
             status = TranscriptionStatus.PENDING,
             transcription_text = None,
-            transcription_json = None
+            transcription_json = None,
+            worker_id = WORKER_ID,
+            lease_until = lease_expiry(settings.task_lease_seconds),
         )
+        if cached is not None:
+            db_task.status = TranscriptionStatus.COMPLETED
+            db_task.transcription_text = cached["text"]
+            db_task.transcription_json = pack_segments(cached.get("segments", []))
+            if charge_cached:
+                await _settle_usage(
+                    db,
+                    db_task.user_id,
+                    anon_user.id,
+                    user_limit,
+                    duration_seconds,
+                    duration_seconds,
+                )
         db.add(db_task)
-        db.commit()
-        db.refresh(db_task)
+        await db.commit()
+        await db.refresh(db_task)
     except HTTPException:
-        db.close()
+        await db.close()
         raise
     except Exception as exc:
-        db.close()
+        await db.close()
+        # значения из RETURNING откатились вместе с транзакцией
+        if account is not None:
+            quota_ledger.invalidate(account)
         _safe_remove(input_path)
         raise HTTPException(status_code=500, detail = f"DB error: {exc}")
-    db.close()
+    await db.close()
 
+    if cached is not None:
+        metrics.TASK_STATUS.labels(status=TranscriptionStatus.COMPLETED).inc()
+        _safe_remove(input_path)
+        transcription_queue.release()
+        TASKS[task_id] = {
+            "status": "done",
+            "input_path": None,
+            "media": media_type,
+            "result": cached["text"],
+            "error": None,
+            "cleanup": [],
+            "segments": cached.get("segments", []),
+            "progress": 100.0,
+            "db_task_id": db_task.id,
+            "duration_seconds": duration_seconds,
+            "probe_ms": probe_ms,
+            "probe_method": probe_method,
+            "model_size": model_size,
+            "cache_hit": True,
+        }
+        task_store.remember(
+            TaskState(public_id=task_id, status="done", result=cached["text"], db_task_id=db_task.id)
+        )
+        _forget_local_task(task_id)
+        return {"task_id": task_id, "cached": True}
 
-    TASKS[task_id] = {
-        "status": "processing",
-        "input_path": input_path,
-        "media": file.content_type or "",
-        "result": None,
-        "error": None,
-        "cleanup": [],
-        "db_task_id": db_task.id if db_task else None,
-        "duration_seconds": duration_seconds,
-    }
+    TASKS[task_id] = _task_entry(
+        input_path,
+        media_type,
+        db_task_id=db_task.id,
+        user_id=db_task.user_id,
+        anon_user_id=db_task.anon_user_id,
+        user_limit=user_limit,
+        quota_reserved=duration_seconds,
+        duration_seconds=duration_seconds,
+        priority=get_priority_for_user(current_user),
+        probe_ms=probe_ms,
+        probe_method=probe_method,
+        model_size=model_size,
+        cache_key=cache_key,
+    )
+    metrics.TASK_STATUS.labels(status=TranscriptionStatus.PENDING).inc()
 
-    asyncio.create_task(_process_task(task_id))
+    transcription_queue.submit(
+        task_id,
+        duration_seconds,
+        reserved=True,
+        priority=TASKS[task_id]["priority"],
+        owner=_queue_owner(db_task.user_id, db_task.anon_user_id),
+        batch_key=_batch_key(duration_seconds, model_size),
+    )
     return {"task_id": task_id}
 
 
-@app.get("/translate/status")
-async def translate_status(task_id: str):
+# Тело запроса пишется на диск и параллельно декодируется ffmpeg из пайпа.
+# Длительность None: контейнер не потоковый (mp4 с moov в конце) или ffmpeg
+# не справился из пайпа - тогда остаётся исходный файл и его нужно пробовать.
+async def _ingest_request(
+    request: Request,
+    task_id: str,
+    filename: str | None,
+    content_type: str | None,
+) -> tuple[str, str, int | None, str]:
+    suffix = os.path.splitext(filename or "")[1] or ".tmp"
+    raw_path = TASKS_DIR / f"{task_id}{suffix}"
+    pcm_path = TASKS_DIR / f"{task_id}.f32"
+    save_started = time.perf_counter()
+    try:
+        content_hash, pcm_seconds = await ingest(
+            request.stream(), raw_path, pcm_path, settings.upload_max_mb * MB, ingest_decoders
+        )
+    except IngestTooLarge as exc:
+        _safe_remove(str(raw_path))
+        raise HTTPException(status_code=413, detail=str(exc))
+    except Exception as exc:
+        _safe_remove(str(raw_path))
+        raise HTTPException(status_code=500, detail=f"Failed to save file: {exc}")
+    metrics.observe_stage("upload_save", time.perf_counter() - save_started)
+
+    if pcm_seconds is None:
+        return str(raw_path), content_type or "", None, content_hash
+    # звук уже извлечён, исходник больше не нужен
+    _safe_remove(str(raw_path))
+    return str(pcm_path), PCM_MEDIA_TYPE, max(1, math.ceil(pcm_seconds)), content_hash
+
+
+@app.post("/translate/ingest")
+async def translate_ingest(
+    request: Request,
+    anon_uuid: str,
+    filename: str | None = None,
+    content_type: str | None = Header(None),
+    current_user: UserSnapshot | None = Depends(get_current_user_optional)
+):
+    try:
+        UUID_cls(anon_uuid)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid anon_uuid format")
+
+    try:
+        transcription_queue.reserve()
+    except QueueFullError as exc:
+        raise _queue_full_response(exc)
+
+    task_id = uuid.uuid4().hex
+    try:
+        input_path, media_type, duration_seconds, content_hash = await _ingest_request(
+            request, task_id, filename, content_type
+        )
+        return await _admit_saved(
+            task_id,
+            input_path,
+            content_hash,
+            media_type,
+            anon_uuid,
+            current_user,
+            known_duration=duration_seconds,
+        )
+    except BaseException:
+        transcription_queue.release()
+        raise
+
+
+def _require_internal_token(x_internal_token: str | None = Header(None)) -> None:
+    # без настроенного токена внутреннего API как будто нет
+    expected = settings.internal_api_token
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_internal_token is None or not secrets.compare_digest(x_internal_token, expected):
+        raise HTTPException(status_code=403, detail="Invalid internal token")
+
+
+# Внутренний вход для собственных клиентов (Telegram-бот): тело запроса - сам файл,
+# задача идёт через общую очередь и модель API, ответ приходит, когда текст готов.
+# Ожидание в том же запросе, поэтому не важно, какой воркер uvicorn его принял.
+# В БД задача не пишется, квоты не применяются - лимиты держит сам клиент.
+@app.post("/internal/transcribe", dependencies=[Depends(_require_internal_token)])
+async def internal_transcribe(
+    request: Request,
+    client_id: str,
+    filename: str | None = None,
+    content_type: str | None = Header(None),
+):
+    try:
+        transcription_queue.reserve()
+    except QueueFullError as exc:
+        raise _queue_full_response(exc)
+
+    task_id = uuid.uuid4().hex
+    try:
+        input_path, media_type, known_duration, content_hash = await _ingest_request(
+            request, task_id, filename, content_type
+        )
+        duration_seconds, _, _ = await _probe_duration(input_path, known_duration)
+
+        model_size = model_registry.default_size
+        cache_key: str | None = None
+        if result_cache is not None:
+            cache_key = _result_cache_key(content_hash, model_size, duration_seconds)
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            if cached is not None:
+                _safe_remove(input_path)
+                transcription_queue.release()
+                return {"text": cached["text"], "duration_seconds": duration_seconds, "cached": True}
+
+        task = _task_entry(
+            input_path,
+            media_type,
+            db_task_id=None,
+            duration_seconds=duration_seconds,
+            priority=PRIORITY_ANON_USER,
+            model_size=model_size,
+            cache_key=cache_key,
+        )
+        TASKS[task_id] = task
+        metrics.TASK_STATUS.labels(status=TranscriptionStatus.PENDING).inc()
+        transcription_queue.submit(
+            task_id,
+            duration_seconds,
+            reserved=True,
+            priority=PRIORITY_ANON_USER,
+            owner=f"internal:{client_id}",
+            batch_key=_batch_key(duration_seconds, model_size),
+        )
+    except BaseException:
+        transcription_queue.release()
+        raise
+
+    # запись в TASKS живёт task_local_ttl после завершения, держим ссылку на неё
+    while task["status"] not in ("done", "error"):
+        await task_events.wait(task_id, LONG_POLL_MAX_SECONDS, final_only=True)
+    if task["status"] == "error":
+        raise HTTPException(status_code=422, detail=task["error"] or "Transcription failed")
+    return {"text": task["result"], "duration_seconds": duration_seconds, "cached": False}
+
+
+CANCELLED_ERROR = "Cancelled by user"
+
+
+@app.post("/translate/cancel")
+async def translate_cancel(
+    task_id: str = Form(...),
+    anon_uuid: str | None = Form(None),
+    current_user: UserSnapshot | None = Depends(get_current_user_optional)
+):
     task = TASKS.get(task_id)
-    if not task:
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    if current_user is not None:
+        owned = task.get("user_id") == current_user.id
+    else:
+        try:
+            anon_user_obj = UUID_cls(anon_uuid or "")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid anon_uuid format")
+        async with AsyncSessionLocal() as db:
+            anon_id = (
+                await db.execute(select(AnonUser.id).where(AnonUser.uuid == anon_user_obj))
+            ).scalar()
+        owned = task.get("user_id") is None and anon_id is not None and task.get("anon_user_id") == anon_id
+    if not owned:
         raise HTTPException(status_code=404, detail="Task not found")
+
+    # отменить можно только задачу, ещё ждущую в очереди
+    if task["status"] != "processing" or not transcription_queue.cancel(task_id):
+        raise HTTPException(status_code=409, detail="Task is already running or finished")
+
+    task["status"] = "error"
+    task["error"] = CANCELLED_ERROR
+    if task.get("db_task_id") is not None:
+        await _fail_task(task, CANCELLED_ERROR)
+    _safe_remove(task["input_path"])
+    metrics.TASK_STATUS.labels(status=TranscriptionStatus.FAILED).inc()
+    task_store.remember(
+        TaskState(public_id=task_id, status="error", error=CANCELLED_ERROR, db_task_id=task.get("db_task_id"))
+    )
+    task_events.notify_final(task_id)
+    _forget_local_task(task_id)
+    return {"status": "cancelled"}
+
+
+def _upload_error_response(exc: UploadError) -> HTTPException:
+    headers = {"Upload-Offset": str(exc.offset)} if exc.offset is not None else None
+    return HTTPException(status_code=exc.status_code, detail=exc.detail, headers=headers)
+
+
+@app.post("/translate/uploads", status_code=201, response_model=UploadCreateResponse)
+async def create_upload(payload: UploadCreateRequest, response: Response):
+    try:
+        UUID_cls(payload.anon_uuid)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid anon_uuid format")
+    try:
+        upload_id = await asyncio.to_thread(
+            resumable_uploads.create,
+            payload.length,
+            payload.filename,
+            payload.content_type,
+            payload.anon_uuid,
+        )
+    except UploadError as exc:
+        raise _upload_error_response(exc)
+    response.headers["Location"] = f"/translate/uploads/{upload_id}"
+    response.headers["Upload-Offset"] = "0"
+    return UploadCreateResponse(upload_id=upload_id)
+
+
+@app.head("/translate/uploads/{upload_id}")
+async def upload_offset(upload_id: str):
+    try:
+        offset = resumable_uploads.offset(upload_id)
+        length = resumable_uploads.meta(upload_id)["length"]
+    except UploadError as exc:
+        raise _upload_error_response(exc)
+    return Response(
+        status_code=200,
+        headers={"Upload-Offset": str(offset), "Upload-Length": str(length), "Cache-Control": "no-store"},
+    )
+
+
+@app.patch("/translate/uploads/{upload_id}", status_code=204)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+):
+    save_started = time.perf_counter()
+    try:
+        offset = await resumable_uploads.append(upload_id, upload_offset, request.stream())
+    except UploadError as exc:
+        raise _upload_error_response(exc)
+    metrics.observe_stage("upload_chunk", time.perf_counter() - save_started)
+    return Response(status_code=204, headers={"Upload-Offset": str(offset)})
+
+
+@app.post("/translate/uploads/{upload_id}/finalize")
+async def finalize_upload(
+    upload_id: str,
+    payload: UploadFinalizeRequest,
+    current_user: UserSnapshot | None = Depends(get_current_user_optional)
+):
+    try:
+        meta = resumable_uploads.meta(upload_id)
+    except UploadError as exc:
+        raise _upload_error_response(exc)
+    suffix = os.path.splitext(meta["filename"])[1] or ".tmp"
+    input_path = TASKS_DIR / f"{upload_id}{suffix}"
+
+    try:
+        transcription_queue.reserve()
+    except QueueFullError as exc:
+        raise _queue_full_response(exc)
+
+    try:
+        try:
+            meta, content_hash = await asyncio.to_thread(
+                resumable_uploads.finalize, upload_id, payload.anon_uuid, input_path
+            )
+        except UploadError as exc:
+            raise _upload_error_response(exc)
+        # id загрузки становится id задачи, файл уже лежит в TASKS_DIR
+        return await _admit_saved(
+            upload_id, str(input_path), content_hash, meta["media_type"], payload.anon_uuid, current_user
+        )
+    except BaseException:
+        transcription_queue.release()
+        raise
+
+
+def _queue_info(task_id: str) -> dict:
+    position = transcription_queue.position(task_id)
+    if position is None:
+        return {}
+    eta = transcription_queue.estimated_start(task_id) or 0.0
+    return {
+        "queue_position": position,
+        "estimated_start_seconds": math.ceil(eta),
+        "estimated_start_at": (datetime.utcnow() + timedelta(seconds=eta)).isoformat() + "Z",
+    }
+
+
+def _state_response(state: TaskState) -> dict:
+    if state.status == "done":
+        return {"status": "done", "transcription": state.result}
+    if state.status == "error":
+        return {"status": "error", "error": state.error or "Unknown error"}
+    return {"status": state.status}
+
+
+def _local_response(task_id: str, task: dict) -> dict:
     status = task["status"]
     if status == "processing":
-        return {"status": "processing"}
+        return {"status": "processing", "progress": task["progress"], **_queue_info(task_id)}
     if status == "done":
         return {"status": "done", "transcription": task["result"]}
     if status == "error":
@@ -311,50 +1068,370 @@ async def translate_status(task_id: str):
     return {"status": status}
 
 
-ANON_TTL_SECONDS = 24 * 3600
-ANON_CLEANUP_INTERVAL = 1 * 3600
+def _on_remote_final(public_id: str) -> None:
+    if public_id not in TASKS:
+        # в кэше может лежать активное состояние, следующий get должен прочитать БД
+        task_store.invalidate(public_id)
+    task_events.notify_final(public_id)
 
-def _cleanup_anon_users(db: Session)->int:
-    cutoff = datetime.utcnow() - timedelta(seconds=ANON_TTL_SECONDS)
-    expired_anon_ids =(
-        db.execute(
-            select(AnonUser.id).where(AnonUser.created_at < cutoff)
-        )
-        .scalars()
-        .all()
+
+final_listener = FinalStatusListener(
+    settings.async_database_url.replace("postgresql+asyncpg://", "postgresql://", 1), _on_remote_final
+)
+
+
+async def _wait_remote(task_id: str, state: TaskState, timeout: float) -> TaskState:
+    deadline = time.monotonic() + timeout
+    while not state.is_final:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if final_listener.connected:
+            # завершение на другом воркере приходит через LISTEN/NOTIFY
+            await task_events.wait(task_id, remaining, final_only=True)
+        else:
+            await asyncio.sleep(min(REMOTE_POLL_SECONDS, remaining))
+        state = await task_store.get(task_id) or state
+    return state
+
+
+@app.get("/translate/status")
+async def translate_status(task_id: str, wait: float = 0):
+    wait = max(0.0, min(wait, LONG_POLL_MAX_SECONDS))
+    task = TASKS.get(task_id)
+    if task is None:
+        # задачу ведёт другой воркер или процесс перезапускался
+        state = await task_store.get(task_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        if wait:
+            state = await _wait_remote(task_id, state, wait)
+        return _state_response(state)
+    # long-poll: отвечаем только при смене итогового статуса, сегменты идут через SSE
+    if wait and task["status"] == "processing":
+        await task_events.wait(task_id, wait, final_only=True)
+    return _local_response(task_id, task)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _segment_events(task_id: str):
+    sent = 0
+    last_position: int | None = -1
+    while True:
+        task = TASKS.get(task_id)
+        if task is None:
+            return
+        if task["status"] == "processing":
+            queue = _queue_info(task_id)
+            if queue.get("queue_position") != last_position:
+                yield _sse("status", {"status": "processing", "progress": task["progress"], **queue})
+                last_position = queue.get("queue_position")
+        segments = task["segments"]
+        while sent < len(segments):
+            yield _sse("segment", {"index": sent, "progress": task["progress"], **segments[sent]})
+            sent += 1
+        status = task["status"]
+        if status == "done":
+            yield _sse("done", {"progress": 100.0, "transcription": task["result"]})
+            return
+        if status == "error":
+            yield _sse("error", {"error": task["error"] or "Unknown error"})
+            return
+        if not await task_events.wait(task_id, SSE_KEEPALIVE_SECONDS):
+            yield ": keepalive\n\n"
+
+
+async def _remote_state_events(task_id: str, state: TaskState):
+    yield _sse("status", {"status": state.status})
+    while not state.is_final:
+        state = await _wait_remote(task_id, state, SSE_KEEPALIVE_SECONDS)
+        if not state.is_final:
+            yield ": keepalive\n\n"
+    if state.status == "done":
+        yield _sse("done", {"progress": 100.0, "transcription": state.result})
+    else:
+        yield _sse("error", {"error": state.error or "Unknown error"})
+
+
+@app.get("/translate/stream")
+async def translate_stream(task_id: str):
+    if task_id in TASKS:
+        events = _segment_events(task_id)
+    else:
+        state = await task_store.get(task_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        events = _remote_state_events(task_id, state)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    if not expired_anon_ids:
-        return 0
-    db.execute(
-        delete(AnonUser).where(AnonUser.id.in_(expired_anon_ids))
+
+
+RECOVERY_FAILED_ERROR = "Interrupted by server restart"
+
+
+async def _fail_interrupted(db_task_ids: list[int], error: str) -> None:
+    if not db_task_ids:
+        return
+    async with AsyncSessionLocal() as db, db.begin():
+        failed = (
+            await db.execute(
+                update(TranscriptionTask)
+                .where(
+                    TranscriptionTask.id.in_(db_task_ids),
+                    TranscriptionTask.status.in_(ACTIVE_STATUSES),
+                    TranscriptionTask.worker_id == WORKER_ID,
+                )
+                .values(status=TranscriptionStatus.FAILED, error=error)
+                .returning(
+                    TranscriptionTask.public_id,
+                    TranscriptionTask.user_id,
+                    TranscriptionTask.anon_user_id,
+                    TranscriptionTask.quota_reserved,
+                )
+            )
+        ).all()
+        await publish_final(db, [row.public_id for row in failed])
+        # резерв прерванных задач возвращаем, иначе он висел бы до конца суток
+        for row in failed:
+            if row.quota_reserved:
+                await _settle_usage(db, row.user_id, row.anon_user_id, None, row.quota_reserved, 0)
+    metrics.TASK_STATUS.labels(status=TranscriptionStatus.FAILED).inc(len(db_task_ids))
+
+
+async def _requeue_interrupted(db_task: TranscriptionTask) -> bool:
+    task_id = db_task.public_id
+    input_path = db_task.input_path
+    if not task_id or not input_path or not os.path.exists(input_path):
+        return False
+
+    duration_seconds = db_task.duration_seconds
+    if duration_seconds is None:
+        try:
+            duration_seconds, _ = await probe_media_seconds(input_path, settings.media_probe_timeout_seconds)
+        except Exception:
+            return False
+
+    # квота списывается только при завершении, поэтому повторный запуск ничего не задваивает
+    TASKS[task_id] = _task_entry(
+        input_path,
+        db_task.media_type or "",
+        db_task_id=db_task.id,
+        user_id=db_task.user_id,
+        anon_user_id=db_task.anon_user_id,
+        user_limit=get_daily_limit_for_user(db_task.user) if db_task.user is not None else None,
+        quota_reserved=db_task.quota_reserved,
+        priority=get_priority_for_user(db_task.user),
+        duration_seconds=duration_seconds,
+        model_size=db_task.model_size,
+        cache_key=None,
+        recovered=True,
+    )
+    # место в очереди зарезервировано до захвата задачи в _recover_batches
+    transcription_queue.submit(
+        task_id,
+        duration_seconds,
+        reserved=True,
+        priority=TASKS[task_id]["priority"],
+        owner=_queue_owner(db_task.user_id, db_task.anon_user_id),
+        batch_key=_batch_key(duration_seconds, db_task.model_size),
     )
-    db.commit()
-    return len(expired_anon_ids)
+    metrics.TASK_STATUS.labels(status=TranscriptionStatus.PENDING).inc()
+    return True
 
-async def _anon_cleanup_loop():
-    while True:
+
+async def _claim_expired(limit: int) -> list[TranscriptionTask]:
+    # Забираем задачи с истёкшей арендой одним UPDATE: параллельный проход другого воркера
+    # пропустит заблокированные строки, а задачи живых воркеров не подходят по аренде.
+    # lease_until IS NULL - задачи, принятые до появления аренды.
+    async with AsyncSessionLocal() as db, db.begin():
+        expired = (
+            select(TranscriptionTask.id)
+            .where(
+                TranscriptionTask.status.in_(ACTIVE_STATUSES),
+                or_(TranscriptionTask.lease_until.is_(None), TranscriptionTask.lease_until < func.now()),
+            )
+            .order_by(TranscriptionTask.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        claimed = (
+            await db.execute(
+                update(TranscriptionTask)
+                .where(TranscriptionTask.id.in_(expired.scalar_subquery()))
+                .values(worker_id=WORKER_ID, lease_until=lease_expiry(settings.task_lease_seconds))
+                .returning(TranscriptionTask.id)
+            )
+        ).scalars().all()
+        if not claimed:
+            return []
+        return list(
+            (
+                await db.execute(
+                    select(TranscriptionTask)
+                    .where(TranscriptionTask.id.in_(claimed))
+                    .order_by(TranscriptionTask.id)
+                )
+            ).unique().scalars().all()
+        )
+
+
+async def _recover_batches() -> int:
+    recovered = 0
+    failed = 0
+    # Захватываем не больше, чем свободно мест в очереди, и резервируем их заранее:
+    # ждать внутри задачи обслуживания нельзя, а захваченные, но не поставленные
+    # в очередь задачи никто не продлевает. Остаток заберёт следующий проход.
+    while recovered + failed < settings.task_recovery_max_tasks:
+        limit = min(
+            settings.task_recovery_batch_size,
+            settings.task_recovery_max_tasks - recovered - failed,
+            transcription_queue.free_slots,
+        )
+        if limit <= 0:
+            break
+        for _ in range(limit):
+            transcription_queue.reserve()
+        unused = limit
         try:
-            db = SessionLocal()
-            deleted = _cleanup_anon_users(db)
-            if deleted:
-                print(f"[cleanup] Deleted {deleted} expired anon users")
-        except Exception as exc:
-            print(f"[cleanup] Error during anon cleanup: {exc}")
+            batch = await _claim_expired(limit)
+            lost: list[int] = []
+            for db_task in batch:
+                requeued = await _requeue_interrupted(db_task)
+                unused -= 1
+                if requeued:
+                    recovered += 1
+                else:
+                    transcription_queue.release()
+                    lost.append(db_task.id)
         finally:
-            try:
-                db.close()
-            except Exception:
-                pass
-        await asyncio.sleep(ANON_CLEANUP_INTERVAL)
+            for _ in range(unused):
+                transcription_queue.release()
+        await _fail_interrupted(lost, RECOVERY_FAILED_ERROR)
+        failed += len(lost)
+        if len(batch) < limit:
+            break
+    if recovered or failed:
+        print(f"[recovery] Re-enqueued {recovered} interrupted tasks, failed {failed}")
+    return recovered + failed
+
+
+async def _sweep_task_files() -> int:
+    # файлы задач, которые сейчас ведут другие воркеры, тоже не трогаем
+    async with AsyncSessionLocal() as db:
+        active = set(
+            (
+                await db.execute(
+                    select(TranscriptionTask.public_id).where(
+                        TranscriptionTask.status.in_(ACTIVE_STATUSES)
+                    )
+                )
+            ).scalars().all()
+        )
+
+    def keep(name: str) -> bool:
+        stem = Path(name).stem
+        return stem in TASKS or stem in active
+
+    return await asyncio.to_thread(
+        maintenance.sweep_files, TASKS_DIR, settings.orphan_file_min_age, settings.file_sweep_limit, keep
+    )
+
+
+def _leased_task_ids() -> list[int]:
+    return [
+        task["db_task_id"]
+        for task in TASKS.values()
+        if task.get("db_task_id") is not None and task["status"] == "processing"
+    ]
+
+
+lease_keeper = LeaseKeeper(settings.task_lease_seconds, settings.task_lease_renew_seconds, _leased_task_ids)
+
+
+maintenance_scheduler = maintenance.MaintenanceScheduler(
+    [
+        maintenance.MaintenanceJob(
+            "anon_users",
+            settings.anon_cleanup_interval,
+            lambda: maintenance.delete_expired_anon_users(
+                settings.anon_ttl_seconds,
+                settings.maintenance_batch_size,
+                settings.maintenance_max_batches,
+                settings.maintenance_batch_pause,
+            ),
+        ),
+        maintenance.MaintenanceJob(
+            "refresh_sessions",
+            settings.session_purge_interval,
+            lambda: maintenance.purge_refresh_sessions(
+                settings.maintenance_batch_size,
+                settings.maintenance_max_batches,
+                settings.maintenance_batch_pause,
+            ),
+        ),
+        maintenance.MaintenanceJob("task_files", settings.file_sweep_interval, _sweep_task_files),
+        maintenance.MaintenanceJob(
+            "temp_files",
+            settings.file_sweep_interval,
+            lambda: asyncio.to_thread(
+                maintenance.sweep_files, files_dir, settings.temp_file_min_age, settings.file_sweep_limit
+            ),
+        ),
+        maintenance.MaintenanceJob(
+            "resumable_uploads",
+            settings.file_sweep_interval,
+            lambda: asyncio.to_thread(resumable_uploads.sweep_expired),
+        ),
+    ],
+    tick=settings.maintenance_tick,
+)
+if settings.task_recovery_enabled:
+    # задачи упавших воркеров перезапускаются, как только истечёт их аренда
+    maintenance_scheduler.jobs.append(
+        maintenance.MaintenanceJob("task_recovery", settings.task_recovery_interval, _recover_batches)
+    )
+
 
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind = engine)
+    upgrade_schema(engine)
 app.include_router(health_db)
 app.include_router(auth_anonymous_router)
 app.include_router(auth_users_router)
 app.include_router(transcriptions_router)
 
 @app.on_event("startup")
-async def startup_cleanup_task():
-    asyncio.create_task(_anon_cleanup_loop())
+async def startup_maintenance():
+    maintenance_scheduler.start()
+
+@app.on_event("startup")
+async def startup_transcription_queue():
+    if inference_pool is not None:
+        inference_pool.start()
+    status_batcher.start()
+    lease_keeper.start()
+    final_listener.start()
+    transcription_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_transcription_queue():
+    # прерванные и ждущие задачи отдаём другим воркерам сразу, не дожидаясь конца аренды
+    leased = _leased_task_ids()
+    await transcription_queue.stop()
+    await lease_keeper.stop()
+    await final_listener.stop()
+    try:
+        await lease_keeper.release(leased)
+    except Exception as exc:
+        print(f"[lease] Failed to release task leases: {exc}")
+    await status_batcher.stop()
+    await maintenance_scheduler.stop()
+    if inference_pool is not None:
+        await inference_pool.stop()
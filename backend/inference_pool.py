@@ -0,0 +1,184 @@
+# backend/inference_pool.py
+import asyncio
+import multiprocessing as mp
+import os
+from multiprocessing.connection import Connection
+
+from backend.transcription import (
+    BatchResult,
+    SegmentCallback,
+    TranscriptionError,
+    model_registry,
+    transcribe_batch,
+    which_file,
+)
+
+WORKER_POLL_SECONDS = 1.0
+WORKER_STOP_TIMEOUT = 5.0
+
+
+class WorkerCrashed(Exception):
+    pass
+
+
+def _worker_main(conn: Connection, cpu_threads: int, memory_budget_mb: int) -> None:
+    # у каждого процесса свой реестр моделей, поэтому и бюджет памяти у него своя доля
+    model_registry.cpu_threads = cpu_threads
+    model_registry.memory_budget_mb = memory_budget_mb
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if job is None:
+            return
+        stage_times: dict = {}
+        if "clips" in job:
+            try:
+                results = transcribe_batch(job["clips"], job["model_size"], stage_times)
+                conn.send(("batch", results, [], stage_times))
+            except Exception as exc:
+                conn.send(("error", f"Unhandled: {exc}", [], stage_times))
+            continue
+        on_segment = None
+        if job.pop("stream_segments", False):
+            on_segment = lambda segment: conn.send(("segment", segment))
+        try:
+            text, cleanup = which_file(**job, on_segment=on_segment, stage_times=stage_times)
+            conn.send(("done", text, cleanup, stage_times))
+        except TranscriptionError as exc:
+            conn.send(("error", str(exc), exc.cleanup, stage_times))
+        except Exception as exc:
+            conn.send(("error", f"Unhandled: {exc}", [], stage_times))
+
+
+class _Worker:
+    def __init__(self, ctx, cpu_threads: int, memory_budget_mb: int) -> None:
+        parent_conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, cpu_threads, memory_budget_mb),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def call(self, job: dict, on_segment: SegmentCallback | None = None) -> tuple:
+        try:
+            self.conn.send(job)
+            while True:
+                if self.conn.poll(WORKER_POLL_SECONDS):
+                    message = self.conn.recv()
+                    if message[0] != "segment":
+                        return message
+                    if on_segment is not None:
+                        on_segment(message[1])
+                    continue
+                if not self.process.is_alive():
+                    raise WorkerCrashed(f"exit code {self.process.exitcode}")
+        except (EOFError, OSError) as exc:
+            self.process.join(WORKER_POLL_SECONDS)
+            raise WorkerCrashed(f"exit code {self.process.exitcode}") from exc
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(WORKER_STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class InferencePool:
+    def __init__(self, workers: int, cpu_threads: int = 0, memory_budget_mb: int = 0) -> None:
+        self.size = max(1, workers)
+        self.cpu_threads = cpu_threads or max(1, (os.cpu_count() or 1) // self.size)
+        self.memory_budget_mb = memory_budget_mb or max(1, model_registry.memory_budget_mb // self.size)
+        self._ctx = mp.get_context("spawn")
+        self._workers: list[_Worker] = []
+        self._idle: asyncio.Queue[_Worker] = asyncio.Queue()
+        self.respawns = 0
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        for _ in range(self.size):
+            worker = _Worker(self._ctx, self.cpu_threads, self.memory_budget_mb)
+            self._workers.append(worker)
+            self._idle.put_nowait(worker)
+
+    async def stop(self) -> None:
+        workers, self._workers = self._workers, []
+        await asyncio.gather(*(asyncio.to_thread(w.stop) for w in workers))
+
+    async def run(
+        self,
+        source,
+        media_type: str,
+        model_size: str | None = None,
+        duration_hint: float | None = None,
+        on_segment: SegmentCallback | None = None,
+        stage_times: dict | None = None,
+    ):
+        job = {
+            "source": source,
+            "media_type": media_type,
+            "model_size": model_size,
+            "duration_hint": duration_hint,
+            "stream_segments": on_segment is not None,
+        }
+        status, message, cleanup, worker_stage_times = await self._call(job, on_segment)
+        if stage_times is not None:
+            stage_times.update(worker_stage_times)
+        if status == "error":
+            raise TranscriptionError(message, cleanup)
+        return message, cleanup
+
+    async def run_batch(
+        self,
+        clips: list[tuple[str, str]],
+        model_size: str | None = None,
+        stage_times: dict | None = None,
+    ) -> list[BatchResult]:
+        job = {"clips": clips, "model_size": model_size}
+        status, payload, _, worker_stage_times = await self._call(job)
+        if stage_times is not None:
+            stage_times.update(worker_stage_times)
+        if status == "error":
+            raise TranscriptionError(payload)
+        return payload
+
+    async def _call(self, job: dict, on_segment: SegmentCallback | None = None) -> tuple:
+        worker = await self._idle.get()
+        try:
+            if not worker.is_alive():
+                worker = await self._respawn(worker)
+            try:
+                return await asyncio.to_thread(worker.call, job, on_segment)
+            except WorkerCrashed as exc:
+                worker = await self._respawn(worker)
+                raise TranscriptionError(f"Inference worker crashed ({exc})") from exc
+        finally:
+            self._idle.put_nowait(worker)
+
+    async def _respawn(self, dead: _Worker) -> _Worker:
+        await asyncio.to_thread(dead.kill)
+        worker = await asyncio.to_thread(_Worker, self._ctx, self.cpu_threads, self.memory_budget_mb)
+        self._workers = [w for w in self._workers if w is not dead]
+        self._workers.append(worker)
+        self.respawns += 1
+        print(f"[inference] Respawned worker, pid {worker.process.pid}")
+        return worker
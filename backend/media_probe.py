@@ -0,0 +1,237 @@
+# backend/media_probe.py
+import asyncio
+import math
+import os
+import struct
+
+PROBE_TIMEOUT_SECONDS = 30
+OGG_TAIL_BYTES = 64 * 1024
+
+MPEG_BITRATES = {
+    # (версия MPEG, слой) -> kbps по индексу
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MPEG_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+
+class MediaProbeError(Exception):
+    pass
+
+
+async def probe_media_seconds(path: str, timeout: float = PROBE_TIMEOUT_SECONDS) -> tuple[int, str]:
+    try:
+        duration = read_header_duration(path)
+    except (OSError, struct.error, ValueError, IndexError):
+        duration = None
+    method = "header"
+    if duration is None:
+        duration = await _ffprobe_duration(path, timeout)
+        method = "ffprobe"
+    return max(1, math.ceil(duration)), method
+
+
+async def _ffprobe_duration(path: str, timeout: float) -> float:
+    process = await asyncio.create_subprocess_exec(
+        "ffprobe",
+        "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise MediaProbeError(f"ffprobe timed out after {timeout} seconds")
+
+    if process.returncode != 0:
+        raise MediaProbeError(stderr.decode(errors="replace").strip() or "ffprobe failed")
+    duration_str = stdout.decode().strip()
+    if not duration_str:
+        raise MediaProbeError("Empty duration from ffprobe")
+    try:
+        duration = float(duration_str)
+    except ValueError:
+        raise MediaProbeError(f"Invalid duration from ffprobe: {duration_str}")
+    if duration < 0:
+        raise MediaProbeError("Negative duration from ffprobe")
+    return duration
+
+
+def read_header_duration(path: str) -> float | None:
+    with open(path, "rb") as f:
+        head = f.read(12)
+        if len(head) < 12:
+            return None
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            duration = _wav_duration(f)
+        elif head[:4] == b"OggS":
+            duration = _ogg_duration(f)
+        elif head[4:8] == b"ftyp":
+            duration = _mp4_duration(f)
+        elif head[:3] == b"ID3" or (head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+            duration = _mp3_duration(f)
+        else:
+            return None
+    if duration is None or not math.isfinite(duration) or duration <= 0:
+        return None
+    return duration
+
+
+def _wav_duration(f) -> float | None:
+    f.seek(12)
+    byte_rate = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        chunk_id, size = struct.unpack("<4sI", header)
+        if chunk_id == b"fmt ":
+            fmt = f.read(size)
+            byte_rate = struct.unpack("<I", fmt[8:12])[0]
+            if size % 2:
+                f.seek(1, os.SEEK_CUR)
+            continue
+        if chunk_id == b"data":
+            if not byte_rate:
+                return None
+            # ffmpeg пишет размер 0xFFFFFFFF, когда не может вернуться к заголовку
+            if size == 0xFFFFFFFF:
+                size = os.fstat(f.fileno()).st_size - f.tell()
+            return size / byte_rate
+        f.seek(size + size % 2, os.SEEK_CUR)
+
+
+def _ogg_duration(f) -> float | None:
+    f.seek(0)
+    first_page = f.read(4096)
+    if b"OpusHead" in first_page:
+        head = first_page.index(b"OpusHead")
+        pre_skip = struct.unpack("<H", first_page[head + 10:head + 12])[0]
+        sample_rate = 48000
+    elif b"\x01vorbis" in first_page:
+        head = first_page.index(b"\x01vorbis")
+        pre_skip = 0
+        sample_rate = struct.unpack("<I", first_page[head + 12:head + 16])[0]
+    else:
+        return None
+
+    size = os.fstat(f.fileno()).st_size
+    f.seek(max(0, size - OGG_TAIL_BYTES))
+    tail = f.read()
+    last_page = tail.rfind(b"OggS")
+    if last_page < 0 or last_page + 14 > len(tail):
+        return None
+    granule = struct.unpack("<q", tail[last_page + 6:last_page + 14])[0]
+    if granule <= 0 or not sample_rate:
+        return None
+    return (granule - pre_skip) / sample_rate
+
+
+def _mp4_duration(f) -> float | None:
+    size = os.fstat(f.fileno()).st_size
+    moov = _find_box(f, 0, size, b"moov")
+    if moov is None:
+        return None
+    mvhd = _find_box(f, moov[0], moov[1], b"mvhd")
+    if mvhd is None:
+        return None
+    f.seek(mvhd[0])
+    body = f.read(32)
+    version = body[0]
+    if version == 1:
+        timescale, duration = struct.unpack(">IQ", body[20:32])
+    else:
+        timescale, duration = struct.unpack(">II", body[12:20])
+    if not timescale:
+        return None
+    return duration / timescale
+
+
+def _find_box(f, start: int, end: int, box_type: bytes) -> tuple[int, int] | None:
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        size, kind = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            return None
+        if kind == box_type:
+            return offset + header_size, offset + size
+        offset += size
+    return None
+
+
+def _mp3_duration(f) -> float | None:
+    f.seek(0)
+    audio_start = 0
+    id3 = f.read(10)
+    if id3[:3] == b"ID3":
+        tag_size = (id3[6] << 21) | (id3[7] << 14) | (id3[8] << 7) | id3[9]
+        audio_start = 10 + tag_size
+
+    f.seek(audio_start)
+    data = f.read(4096)
+    sync = next(
+        (i for i in range(len(data) - 4) if data[i] == 0xFF and data[i + 1] & 0xE0 == 0xE0),
+        None,
+    )
+    if sync is None:
+        return None
+    header = struct.unpack(">I", data[sync:sync + 4])[0]
+    version_bits = (header >> 19) & 0x3
+    layer_bits = (header >> 17) & 0x3
+    bitrate_index = (header >> 12) & 0xF
+    rate_index = (header >> 10) & 0x3
+    channel_mode = (header >> 6) & 0x3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    version = {3: 1, 2: 2, 0: 2.5}[version_bits]
+    layer = 4 - layer_bits
+    sample_rate = MPEG_SAMPLE_RATES[version][rate_index]
+    bitrate = MPEG_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    if layer == 1:
+        samples_per_frame = 384
+    elif layer == 3 and version != 1:
+        samples_per_frame = 576
+    else:
+        samples_per_frame = 1152
+
+    if version == 1:
+        side_info = 17 if channel_mode == 3 else 32
+    else:
+        side_info = 9 if channel_mode == 3 else 17
+    xing = sync + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 0x1:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+            return frames * samples_per_frame / sample_rate
+    vbri = sync + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI":
+        frames = struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+        return frames * samples_per_frame / sample_rate
+
+    size = os.fstat(f.fileno()).st_size
+    return (size - audio_start - sync) * 8 / bitrate
@@ -32,7 +32,14 @@ class AnonUser(Base):
         nullable=False, 
         default=0
         )
+    daily_reserved_time: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0"
+        )
     transcription_tasks: Mapped[List["TranscriptionTask"]] = relationship(
         back_populates="anon_user", 
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
         )
\ No newline at end of file
@@ -1,5 +1,5 @@
 #backend/models/transcription_tasks.py
-from sqlalchemy import String, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import String, DateTime, Text, JSON, ForeignKey, Integer, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from backend.db.session import Base
@@ -20,6 +20,12 @@ class TranscriptionTask(Base):
     id: Mapped[int] = mapped_column(
         primary_key=True
         )
+    public_id: Mapped[Optional[str]] = mapped_column(
+        String(32),
+        unique=True,
+        index=True,
+        nullable=True
+        )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=datetime.utcnow, 
@@ -48,6 +54,41 @@ class TranscriptionTask(Base):
         JSON, 
         nullable=True
         )
+    error: Mapped[Optional[str]] = mapped_column(
+        Text,
+        nullable=True
+        )
+    duration_seconds: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        nullable=True
+        )
+    # нужны, чтобы доставить задачу в очередь после перезапуска API
+    input_path: Mapped[Optional[str]] = mapped_column(
+        String(512),
+        nullable=True
+        )
+    media_type: Mapped[Optional[str]] = mapped_column(
+        String(128),
+        nullable=True
+        )
+    model_size: Mapped[Optional[str]] = mapped_column(
+        String(32),
+        nullable=True
+        )
+    # сколько секунд квоты держит задача до завершения
+    quota_reserved: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        nullable=True
+        )
+    # какой воркер ведёт задачу и до какого момента; просроченную аренду забирает восстановление
+    worker_id: Mapped[Optional[str]] = mapped_column(
+        String(128),
+        nullable=True
+        )
+    lease_until: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+        )
     user: Mapped[Optional["User"]] = relationship(
         back_populates="transcription_tasks", 
         lazy="joined"
@@ -55,4 +96,19 @@ class TranscriptionTask(Base):
     anon_user: Mapped[Optional["AnonUser"]] = relationship(
         back_populates="transcription_tasks", 
         lazy="joined"
-        )
\ No newline at end of file
+        )
+
+
+# история пользователя читается страницами по (created_at, id) от новых к старым
+Index(
+    "ix_transcription_tasks_user_created",
+    TranscriptionTask.user_id,
+    TranscriptionTask.created_at.desc(),
+    TranscriptionTask.id.desc(),
+)
+Index(
+    "ix_transcription_tasks_anon_created",
+    TranscriptionTask.anon_user_id,
+    TranscriptionTask.created_at.desc(),
+    TranscriptionTask.id.desc(),
+)
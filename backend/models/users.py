@@ -38,6 +38,13 @@ class User(Base):
         nullable=False,
         default=0
         )
+    # секунды, зарезервированные задачами в очереди и в работе
+    daily_reserved_time: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0"
+        )
     relevant_day: Mapped[date] = mapped_column(
         Date,
         nullable=True
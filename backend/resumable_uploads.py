@@ -0,0 +1,147 @@
+# backend/resumable_uploads.py
+import fcntl
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator
+
+# tus-подобный протокол: create -> PATCH кусками со смещением -> finalize.
+# Текущее смещение = размер файла на диске, поэтому HEAD стоит один stat()
+# и переживает перезапуск и смену воркера.
+
+
+class UploadError(Exception):
+    def __init__(self, status_code: int, detail: str, offset: int | None = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.offset = offset
+
+
+class ResumableUploads:
+    def __init__(self, directory: Path, max_bytes: int, expire_seconds: float) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.expire_seconds = expire_seconds
+        # sha256 считаем по ходу загрузки; если кусок ушёл в другой процесс,
+        # состояние сбрасывается и хэш досчитывается при finalize
+        self._hashers: dict[str, tuple[int, "hashlib._Hash"]] = {}
+
+    def _data_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.json"
+
+    def create(self, length: int, filename: str | None, media_type: str | None, anon_uuid: str) -> str:
+        if length <= 0:
+            raise UploadError(400, "Upload-Length must be positive")
+        if length > self.max_bytes:
+            raise UploadError(413, "Upload is too large")
+        upload_id = uuid.uuid4().hex
+        meta = {
+            "length": length,
+            "filename": filename or "",
+            "media_type": media_type or "",
+            "anon_uuid": anon_uuid,
+            "created_at": time.time(),
+        }
+        self._data_path(upload_id).touch()
+        tmp_path = self._meta_path(upload_id).with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, self._meta_path(upload_id))
+        self._hashers[upload_id] = (0, hashlib.sha256())
+        return upload_id
+
+    def meta(self, upload_id: str) -> dict:
+        try:
+            return json.loads(self._meta_path(upload_id).read_text())
+        except (OSError, ValueError):
+            raise UploadError(404, "Upload not found")
+
+    def offset(self, upload_id: str) -> int:
+        try:
+            return self._data_path(upload_id).stat().st_size
+        except OSError:
+            raise UploadError(404, "Upload not found")
+
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> int:
+        meta = self.meta(upload_id)
+        length = meta["length"]
+        with open(self._data_path(upload_id), "ab") as f:
+            try:
+                # параллельный PATCH того же файла (в том числе из другого воркера)
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError(423, "Upload is locked by another request")
+            current = os.fstat(f.fileno()).st_size
+            if offset != current:
+                raise UploadError(409, "Upload-Offset mismatch", offset=current)
+
+            hashed_to, digest = self._hashers.get(upload_id, (-1, None))
+            if hashed_to != current:
+                digest = None
+            written = current
+            try:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if written + len(chunk) > length:
+                        raise UploadError(413, "Chunk exceeds Upload-Length", offset=written)
+                    f.write(chunk)
+                    written += len(chunk)
+                    if digest is not None:
+                        digest.update(chunk)
+            finally:
+                # оборванное соединение оставляет на диске то, что успело прийти
+                f.flush()
+                if digest is not None:
+                    self._hashers[upload_id] = (written, digest)
+                else:
+                    self._hashers.pop(upload_id, None)
+        return written
+
+    def finalize(self, upload_id: str, anon_uuid: str, target: Path) -> tuple[dict, str]:
+        meta = self.meta(upload_id)
+        if meta["anon_uuid"] != anon_uuid:
+            raise UploadError(404, "Upload not found")
+        data_path = self._data_path(upload_id)
+        with open(data_path, "rb") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError(423, "Upload is locked by another request")
+            size = os.fstat(f.fileno()).st_size
+            if size != meta["length"]:
+                raise UploadError(409, "Upload is incomplete", offset=size)
+
+            hashed_to, digest = self._hashers.pop(upload_id, (-1, None))
+            if hashed_to != size:
+                digest = hashlib.sha256()
+                while chunk := f.read(2 * 1024 * 1024):
+                    digest.update(chunk)
+            os.replace(data_path, target)
+        self._meta_path(upload_id).unlink(missing_ok=True)
+        return meta, digest.hexdigest()
+
+    def sweep_expired(self) -> int:
+        cutoff = time.time() - self.expire_seconds
+        removed = 0
+        for meta_path in self.directory.glob("*.json"):
+            upload_id = meta_path.stem
+            data_path = self._data_path(upload_id)
+            try:
+                last_write = max(meta_path.stat().st_mtime, data_path.stat().st_mtime)
+            except OSError:
+                last_write = 0
+            if last_write > cutoff:
+                continue
+            data_path.unlink(missing_ok=True)
+            meta_path.unlink(missing_ok=True)
+            self._hashers.pop(upload_id, None)
+            removed += 1
+        return removed
@@ -6,7 +6,19 @@ class TranscriptionItem(BaseModel):
     id: int
     created_at: datetime
     status: str
+    # в списке - только начало текста, полный текст отдаёт GET /transcriptions/{id}
     text: str
+    text_length: int = 0
+    truncated: bool = False
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+
+class TranscriptionDetail(BaseModel):
+    id: int
+    created_at: datetime
+    status: str
+    text: str
+    duration_seconds: int | None = None
+    error: str | None = None
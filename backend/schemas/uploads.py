@@ -0,0 +1,18 @@
+# backend/schemas/uploads.py
+from pydantic import BaseModel
+
+
+class UploadCreateRequest(BaseModel):
+    length: int
+    anon_uuid: str
+    filename: str | None = None
+    content_type: str | None = None
+
+
+class UploadCreateResponse(BaseModel):
+    upload_id: str
+    offset: int = 0
+
+
+class UploadFinalizeRequest(BaseModel):
+    anon_uuid: str
@@ -0,0 +1,160 @@
+# backend/streaming_ingest.py
+import asyncio
+import hashlib
+import struct
+from pathlib import Path
+from typing import AsyncIterator
+
+from backend.transcription import SAMPLE_RATE, PCM_READ_CHUNK
+
+# сколько байт начала файла держим, пока не ясно, можно ли кормить ffmpeg из пайпа
+STREAM_HEAD_MAX = 8 * 1024 * 1024
+
+
+class IngestTooLarge(Exception):
+    pass
+
+
+# True - можно декодировать из пайпа, False - нужен файл целиком, None - мало данных
+def container_streamable(head: bytes) -> bool | None:
+    if len(head) < 8:
+        return None
+    if head[4:8] != b"ftyp":
+        # wav, mp3, ogg, flac, webm/mkv читаются ffmpeg последовательно
+        return True
+    # mp4/mov: поток возможен только при moov перед mdat (faststart)
+    pos = 0
+    while pos + 8 <= len(head):
+        size, kind = struct.unpack(">I4s", head[pos:pos + 8])
+        if size == 1:
+            if pos + 16 > len(head):
+                return None
+            size = struct.unpack(">Q", head[pos + 8:pos + 16])[0]
+        if kind == b"moov":
+            return True
+        if kind == b"mdat" or size < 8:
+            return False
+        pos += size
+    return None
+
+
+class PipeDecoder:
+    def __init__(self, process: asyncio.subprocess.Process, pcm_path: Path) -> None:
+        self.process = process
+        self.pcm_path = pcm_path
+        self.failed = False
+        self._errors: list[bytes] = []
+        self._stdout_task = asyncio.create_task(self._copy_stdout())
+        self._stderr_task = asyncio.create_task(self._read_stderr())
+
+    @classmethod
+    async def start(cls, pcm_path: Path) -> "PipeDecoder":
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-v", "error",
+            "-i", "pipe:0",
+            "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),
+            "-f", "f32le", "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        return cls(process, pcm_path)
+
+    async def _copy_stdout(self) -> None:
+        with open(self.pcm_path, "wb") as pcm:
+            while chunk := await self.process.stdout.read(PCM_READ_CHUNK):
+                pcm.write(chunk)
+
+    async def _read_stderr(self) -> None:
+        self._errors.append(await self.process.stderr.read())
+
+    async def feed(self, chunk: bytes) -> bool:
+        if self.failed:
+            return False
+        try:
+            self.process.stdin.write(chunk)
+            # если ffmpeg не успевает, притормаживаем чтение тела запроса
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            self.failed = True
+        return not self.failed
+
+    async def finish(self) -> float | None:
+        try:
+            self.process.stdin.close()
+            await self.process.stdin.wait_closed()
+        except (BrokenPipeError, ConnectionResetError):
+            self.failed = True
+        returncode = await self.process.wait()
+        await asyncio.gather(self._stdout_task, self._stderr_task)
+        size = self.pcm_path.stat().st_size if self.pcm_path.exists() else 0
+        if self.failed or returncode != 0 or size == 0:
+            message = b"".join(self._errors).decode(errors="replace").strip()
+            print(f"[ingest] Streaming decode failed with code {returncode}: {message}")
+            self.pcm_path.unlink(missing_ok=True)
+            return None
+        return size / 4 / SAMPLE_RATE
+
+    async def abort(self) -> None:
+        if self.process.returncode is None:
+            self.process.kill()
+        await self.process.wait()
+        await asyncio.gather(self._stdout_task, self._stderr_task, return_exceptions=True)
+        self.pcm_path.unlink(missing_ok=True)
+
+
+async def ingest(
+    chunks: AsyncIterator[bytes],
+    raw_path: Path,
+    pcm_path: Path,
+    max_bytes: int,
+    decoders: asyncio.Semaphore,
+) -> tuple[str, float | None]:
+    # длительность None: контейнер не потоковый или декодирование не удалось
+    digest = hashlib.sha256()
+    decoder: PipeDecoder | None = None
+    head = bytearray()
+    decided = False
+    acquired = False
+    received = 0
+    try:
+        with open(raw_path, "wb") as raw:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                received += len(chunk)
+                if received > max_bytes:
+                    raise IngestTooLarge("Upload is too large")
+                digest.update(chunk)
+                raw.write(chunk)
+
+                if not decided:
+                    head += chunk
+                    streamable = container_streamable(bytes(head))
+                    if streamable is None and len(head) < STREAM_HEAD_MAX:
+                        continue
+                    decided = True
+                    # число одновременных ffmpeg ограничено, без слота идём обычным путём
+                    if streamable and not decoders.locked():
+                        await decoders.acquire()
+                        acquired = True
+                        decoder = await PipeDecoder.start(pcm_path)
+                    chunk = bytes(head)
+                    head = bytearray()
+
+                if decoder is not None and not await decoder.feed(chunk):
+                    await decoder.abort()
+                    decoder = None
+
+        if decoder is None:
+            return digest.hexdigest(), None
+        seconds = await decoder.finish()
+        decoder = None
+        return digest.hexdigest(), seconds
+    except BaseException:
+        if decoder is not None:
+            await decoder.abort()
+        raise
+    finally:
+        if acquired:
+            decoders.release()
@@ -0,0 +1,63 @@
+# backend/transcript_formats.py
+import json
+
+SEGMENTS_FORMAT_VERSION = 1
+
+EXPORT_FORMATS = {
+    "txt": "text/plain; charset=utf-8",
+    "srt": "application/x-subrip; charset=utf-8",
+    "vtt": "text/vtt; charset=utf-8",
+    "json": "application/json",
+}
+
+
+def pack_segments(segments: list[dict]) -> dict:
+    packed = []
+    for segment in segments:
+        row = [segment["start"], segment["end"], segment["text"], segment.get("avg_logprob")]
+        if segment.get("words"):
+            row.append(segment["words"])
+        packed.append(row)
+    return {"v": SEGMENTS_FORMAT_VERSION, "segments": packed}
+
+
+def unpack_segments(data: dict | None) -> list[dict] | None:
+    if not data or data.get("v") != SEGMENTS_FORMAT_VERSION:
+        return None
+    segments = []
+    for row in data.get("segments", []):
+        segment = {"start": row[0], "end": row[1], "text": row[2], "avg_logprob": row[3]}
+        if len(row) > 4:
+            segment["words"] = [
+                {"start": w[0], "end": w[1], "word": w[2], "probability": w[3]}
+                for w in row[4]
+            ]
+        segments.append(segment)
+    return segments
+
+
+def render(segments: list[dict], fmt: str) -> str:
+    if fmt == "txt":
+        return "\n".join(segment["text"] for segment in segments)
+    if fmt == "srt":
+        return "\n".join(
+            f"{index}\n{_timestamp(s['start'], ',')} --> {_timestamp(s['end'], ',')}\n{s['text']}\n"
+            for index, s in enumerate(segments, start=1)
+        )
+    if fmt == "vtt":
+        cues = "\n".join(
+            f"{_timestamp(s['start'], '.')} --> {_timestamp(s['end'], '.')}\n{s['text']}\n"
+            for s in segments
+        )
+        return f"WEBVTT\n\n{cues}"
+    if fmt == "json":
+        return json.dumps({"segments": segments}, ensure_ascii=False)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def _timestamp(seconds: float, separator: str) -> str:
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
@@ -1,18 +1,78 @@
 # backend/transcription.py
-from faster_whisper import WhisperModel
+from faster_whisper import WhisperModel, __version__ as FASTER_WHISPER_VERSION
+from faster_whisper.audio import pad_or_trim
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+from bisect import bisect_right
 from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Callable, Iterator
+import numpy as np
 import subprocess
 import tempfile
+import threading
+import time
 import os
+import re
+from backend.core.config import get_settings
 
-model_size = "small"  # "small"/"medium"/"large-v3"
+try:
+    from faster_whisper import BatchedInferencePipeline
+except ImportError:  # faster-whisper < 1.1
+    BatchedInferencePipeline = None
 
-model = WhisperModel("small", device="cpu", compute_type="float32", cpu_threads=3, num_workers=1)
+# clip_timestamps в секундах BatchedInferencePipeline принимает с 1.1.1, раньше - в сэмплах
+BATCH_MIN_VERSION = (1, 1, 1)
+
+settings = get_settings()
+
+# примерный объём модели в памяти при float32, МБ
+MODEL_MEMORY_MB = {
+    "tiny": 300,
+    "base": 500,
+    "small": 1200,
+    "medium": 3000,
+    "large-v2": 6000,
+    "large-v3": 6000,
+}
+# доля от размера float32 для остальных типов вычислений CTranslate2
+COMPUTE_TYPE_MEMORY_FACTOR = {
+    "float32": 1.0,
+    "float16": 0.5,
+    "bfloat16": 0.5,
+    "int8_float32": 0.35,
+    "int8_float16": 0.3,
+    "int8_bfloat16": 0.3,
+    "int8": 0.3,
+}
 
 files_dir = "/root/filety/backend/files/"
 os.makedirs(files_dir, exist_ok=True)
 
-MAX_SIZE_IN_MEMORY = 5 * 1024 * 1024
+SAMPLE_RATE = 16000
+DECODE_DEFAULT_SECONDS = 10 * 60
+PCM_READ_CHUNK = 1024 * 1024
+# уже декодированный при приёме загрузки звук: сырой f32le, моно, SAMPLE_RATE
+PCM_MEDIA_TYPE = "audio/x-pcm-f32le"
+# паузы короче этого не считаются границей чанка
+LONG_FILE_MIN_SILENCE_MS = 500
+WHISPER_WINDOW_SECONDS = 30
+# Клипы микропакета склеиваются в один массив, каждому отводится слот длиннее половины окна
+# whisper: так BatchedInferencePipeline не объединит два клипа в один чанк. Тишина в хвосте
+# слота ничего не стоит - вход модели всё равно дополняется нулями до 30 секунд.
+BATCH_SLOT_MIN_SECONDS = WHISPER_WINDOW_SECONDS / 2 + 0.5
+# параметры, которые понимает BatchedInferencePipeline.transcribe
+BATCH_OPTION_KEYS = ("task", "beam_size", "word_timestamps")
+
+TRANSCRIBE_OPTIONS = {
+    "task": "transcribe",
+    "language": None,
+    "condition_on_previous_text": False,
+    "beam_size": 5,
+    "vad_filter": True,
+    "word_timestamps": settings.whisper_word_timestamps,
+}
 
 
 class TranscriptionError(Exception):
@@ -21,13 +81,134 @@ class TranscriptionError(Exception):
         self.cleanup = cleanup or []
 
 
-def which_file(source, media_type: str):
+class ModelRegistry:
+    def __init__(
+        self,
+        default_size: str,
+        allowed_sizes: list[str],
+        memory_budget_mb: int,
+        device: str,
+        compute_type: str,
+        cpu_threads: int,
+        num_workers: int,
+    ) -> None:
+        self.default_size = default_size
+        self.allowed_sizes = set(allowed_sizes) | {default_size}
+        self.memory_budget_mb = memory_budget_mb
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        self._models: OrderedDict[str, WhisperModel] = OrderedDict()
+        self._in_use: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_locks: dict[str, threading.Lock] = {}
+
+    def resolve(self, size: str | None) -> str:
+        if size in self.allowed_sizes:
+            return size
+        return self.default_size
+
+    def loaded(self) -> list[str]:
+        with self._lock:
+            return list(self._models)
+
+    @contextmanager
+    def acquire(self, size: str | None = None) -> Iterator[WhisperModel]:
+        size = self.resolve(size)
+        model = self._checkout(size)
+        try:
+            yield model
+        finally:
+            with self._lock:
+                self._in_use[size] -= 1
+                self._evict()
+
+    def _checkout(self, size: str) -> WhisperModel:
+        with self._lock:
+            model = self._take(size)
+            if model is not None:
+                return model
+            load_lock = self._load_locks.setdefault(size, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                model = self._take(size)
+                if model is not None:
+                    return model
+            model = WhisperModel(
+                size,
+                device=self.device,
+                compute_type=self.compute_type,
+                cpu_threads=self.cpu_threads,
+                num_workers=self.num_workers,
+            )
+            with self._lock:
+                self._models[size] = model
+                self._in_use[size] = self._in_use.get(size, 0) + 1
+                self._evict()
+            return model
+
+    def _take(self, size: str) -> WhisperModel | None:
+        model = self._models.get(size)
+        if model is None:
+            return None
+        self._models.move_to_end(size)
+        self._in_use[size] = self._in_use.get(size, 0) + 1
+        return model
+
+    def model_memory_mb(self, size: str) -> float:
+        return MODEL_MEMORY_MB.get(size, 0) * COMPUTE_TYPE_MEMORY_FACTOR.get(self.compute_type, 1.0)
+
+    def _evict(self) -> None:
+        used = sum(self.model_memory_mb(size) for size in self._models)
+        for size in list(self._models):
+            if used <= self.memory_budget_mb:
+                break
+            if self._in_use.get(size, 0) > 0:
+                continue
+            del self._models[size]
+            self._in_use.pop(size, None)
+            used -= self.model_memory_mb(size)
+
+
+model_registry = ModelRegistry(
+    default_size=settings.whisper_default_model,
+    allowed_sizes=settings.whisper_model_sizes,
+    memory_budget_mb=settings.whisper_memory_budget_mb,
+    device=settings.whisper_device,
+    compute_type=settings.whisper_compute_type,
+    cpu_threads=settings.whisper_cpu_threads,
+    num_workers=max(settings.whisper_num_workers, settings.long_file_parallelism),
+)
+
+
+SegmentCallback = Callable[[dict], None]
+
+
+def which_file(
+    source,
+    media_type: str,
+    model_size: str | None = None,
+    duration_hint: float | None = None,
+    on_segment: SegmentCallback | None = None,
+    stage_times: dict | None = None,
+):
     cleanup: list[str] = []
     try:
-        if media_type.startswith("video"):
-            text, extra = extract_audio(source)
+        if media_type == PCM_MEDIA_TYPE:
+            cleanup.append(source)
+            started = time.perf_counter()
+            source = load_pcm(source)
+            _record_stage(stage_times, "audio_extraction", started)
+        if duration_hint and duration_hint >= settings.long_file_min_seconds:
+            text, extra = transcribe_long(source, model_size, duration_hint, on_segment, stage_times)
+        elif isinstance(source, np.ndarray):
+            text, extra = transcription(source, model_size, on_segment, stage_times)
+        elif media_type.startswith("video"):
+            text, extra = extract_audio(source, model_size, duration_hint, on_segment, stage_times)
         else:
-            text, extra = transcription(source)
+            text, extra = transcription(source, model_size, on_segment, stage_times)
         cleanup.extend(extra)
         return text, cleanup
     except TranscriptionError as exc:
@@ -37,43 +218,19 @@ def which_file(source, media_type: str):
         raise TranscriptionError(str(exc), cleanup) from exc
 
 
-def extract_audio(source):
+def extract_audio(
+    source,
+    model_size: str | None = None,
+    duration_hint: float | None = None,
+    on_segment: SegmentCallback | None = None,
+    stage_times: dict | None = None,
+):
     cleanup: list[str] = []
     try:
-        fd, temp_audio = tempfile.mkstemp(suffix=".wav", dir=files_dir)
-        os.close(fd)
-        cleanup.append(temp_audio)
-
-        if isinstance(source, BytesIO):
-            fd_in, temp_video = tempfile.mkstemp(suffix=".mp4", dir=files_dir)
-            os.close(fd_in)
-            cleanup.append(temp_video)
-
-            with open(temp_video, "wb") as f:
-                f.write(source.read())
-
-            subprocess.run(
-                ["ffmpeg", "-y", "-i", temp_video, "-vn", "-ac", "1", "-ar", "16000", "-f", "wav", temp_audio],
-                check=True,
-                stderr=subprocess.DEVNULL,
-            )
-        else:
-            subprocess.run(
-                ["ffmpeg", "-y", "-i", source, "-vn", "-ac", "1", "-ar", "16000", "-f", "wav", temp_audio],
-                check=True,
-                stderr=subprocess.DEVNULL,
-            )
-
-        wav_size = os.path.getsize(temp_audio)
-
-        if wav_size <= MAX_SIZE_IN_MEMORY:
-            with open(temp_audio, "rb") as f:
-                data = f.read()
-            buffer = BytesIO(data)
-            buffer.seek(0)
-            text, extra = transcription(buffer)
-        else:
-            text, extra = transcription(temp_audio)
+        started = time.perf_counter()
+        audio = decode_audio(_source_path(source, cleanup), duration_hint)
+        _record_stage(stage_times, "audio_extraction", started)
+        text, extra = transcription(audio, model_size, on_segment, stage_times)
 
         cleanup.extend(extra)
         return text, cleanup
@@ -84,7 +241,274 @@ def extract_audio(source):
         raise TranscriptionError(str(exc), cleanup) from exc
 
 
-def transcription(source):
+def transcribe_long(
+    source,
+    model_size: str | None = None,
+    duration_hint: float | None = None,
+    on_segment: SegmentCallback | None = None,
+    stage_times: dict | None = None,
+):
+    cleanup: list[str] = []
+    try:
+        started = time.perf_counter()
+        if isinstance(source, np.ndarray):
+            audio = source
+        else:
+            audio = decode_audio(_source_path(source, cleanup), duration_hint)
+        chunks = split_on_silence(audio, settings.long_file_chunk_seconds)
+        if not isinstance(source, np.ndarray):
+            _record_stage(stage_times, "audio_extraction", started)
+
+        texts: list[str] = []
+        with model_registry.acquire(model_size) as model:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=settings.long_file_parallelism) as pool:
+                futures = {
+                    pool.submit(_transcribe_chunk, model, audio, start, end): index
+                    for index, (start, end) in enumerate(chunks)
+                }
+                done: dict[int, list[dict]] = {}
+                next_index = 0
+                for future in as_completed(futures):
+                    done[futures[future]] = future.result()
+                    # отдаём сегменты строго по порядку чанков
+                    while next_index in done:
+                        for segment in done.pop(next_index):
+                            texts.append(segment["text"])
+                            if on_segment is not None:
+                                on_segment(segment)
+                        next_index += 1
+            _record_stage(stage_times, "inference", started)
+
+        return " ".join(texts), cleanup
+    except Exception as exc:
+        raise TranscriptionError(str(exc), cleanup) from exc
+
+
+# результат клипа из пакета: текст, сегменты, ошибка
+BatchResult = tuple[str | None, list[dict], str | None]
+
+
+def batch_supported() -> bool:
+    version = tuple(int(part) for part in re.findall(r"\d+", FASTER_WHISPER_VERSION)[:3])
+    return BatchedInferencePipeline is not None and version >= BATCH_MIN_VERSION
+
+
+def transcribe_batch(
+    clips: list[tuple[str, str]],
+    model_size: str | None = None,
+    stage_times: dict | None = None,
+) -> list[BatchResult]:
+    results: list[BatchResult | None] = [None] * len(clips)
+    audios: dict[int, np.ndarray] = {}
+    started = time.perf_counter()
+    for index, (source, media_type) in enumerate(clips):
+        try:
+            if media_type == PCM_MEDIA_TYPE:
+                audios[index] = load_pcm(source)
+            else:
+                audios[index] = decode_audio(source, WHISPER_WINDOW_SECONDS)
+        except Exception as exc:
+            results[index] = (None, [], str(exc))
+    _record_stage(stage_times, "audio_extraction", started)
+
+    with model_registry.acquire(model_size) as model:
+        started = time.perf_counter()
+        batchable: list[int] = []
+        for index, audio in audios.items():
+            if audio.size == 0:
+                results[index] = ("", [], None)
+            elif audio.size > WHISPER_WINDOW_SECONDS * SAMPLE_RATE:
+                # длительность при приёме оценена неточно, в одно окно клип не помещается
+                results[index] = _transcribe_single(model, audio)
+            else:
+                batchable.append(index)
+
+        # пайплайн определяет язык один раз на вызов, поэтому клипы группируем по языку
+        languages: list[str | None] = [TRANSCRIBE_OPTIONS["language"]] * len(batchable)
+        if batchable and TRANSCRIBE_OPTIONS["language"] is None:
+            try:
+                languages = _detect_languages(model, [audios[index] for index in batchable])
+            except Exception as exc:
+                print(f"[batch] Language detection failed, letting the pipeline detect it: {exc}")
+        groups: dict[str | None, list[int]] = {}
+        for index, language in zip(batchable, languages):
+            groups.setdefault(language, []).append(index)
+
+        for language, indexes in groups.items():
+            try:
+                batch = _transcribe_group(model, [audios[index] for index in indexes], language)
+            except Exception as exc:
+                print(f"[batch] Batched inference failed, transcribing {len(indexes)} clips one by one: {exc}")
+                batch = [_transcribe_single(model, audios[index]) for index in indexes]
+            for index, result in zip(indexes, batch):
+                results[index] = result
+        _record_stage(stage_times, "inference", started)
+    return results
+
+
+# язык всех клипов за один пакетный проход энкодера, а не по проходу на клип
+def _detect_languages(model: WhisperModel, audios: list[np.ndarray]) -> list[str]:
+    frames = model.feature_extractor.nb_max_frames
+    features = np.stack([pad_or_trim(model.feature_extractor(audio)[:, :frames]) for audio in audios])
+    detected = model.model.detect_language(model.encode(features))
+    # каждый элемент - [(токен "<|ru|>", вероятность), ...] по убыванию вероятности
+    return [result[0][0][2:-2] for result in detected]
+
+
+def _transcribe_single(model: WhisperModel, audio: np.ndarray) -> BatchResult:
+    try:
+        segments, info = model.transcribe(audio, **TRANSCRIBE_OPTIONS)
+        payloads = [_segment_payload(segment) for segment in segments]
+    except Exception as exc:
+        return None, [], str(exc)
+    return " ".join(payload["text"] for payload in payloads), payloads, None
+
+
+def _transcribe_group(model: WhisperModel, audios: list[np.ndarray], language: str | None) -> list[BatchResult]:
+    slot = int(BATCH_SLOT_MIN_SECONDS * SAMPLE_RATE)
+    starts: list[int] = []
+    total = 0
+    for audio in audios:
+        starts.append(total)
+        total += max(audio.size, slot)
+    joined = np.zeros(total, dtype=np.float32)
+    for start, audio in zip(starts, audios):
+        joined[start:start + audio.size] = audio
+    clip_timestamps = [
+        {"start": start / SAMPLE_RATE, "end": end / SAMPLE_RATE}
+        for start, end in zip(starts, starts[1:] + [total])
+    ]
+
+    options = {key: TRANSCRIBE_OPTIONS[key] for key in BATCH_OPTION_KEYS}
+    segments, info = BatchedInferencePipeline(model).transcribe(
+        joined,
+        language=language,
+        vad_filter=False,
+        clip_timestamps=clip_timestamps,
+        batch_size=len(audios),
+        without_timestamps=False,
+        **options,
+    )
+    per_clip: list[list[dict]] = [[] for _ in audios]
+    for segment in segments:
+        # время сегментов - в координатах склейки, клип определяем по середине сегмента
+        middle = int((segment.start + segment.end) / 2 * SAMPLE_RATE)
+        index = max(0, bisect_right(starts, middle) - 1)
+        per_clip[index].append(_segment_payload(segment, -starts[index] / SAMPLE_RATE))
+    return [(" ".join(payload["text"] for payload in payloads), payloads, None) for payloads in per_clip]
+
+
+def split_on_silence(audio: np.ndarray, chunk_seconds: float) -> list[tuple[int, int]]:
+    speech = get_speech_timestamps(
+        audio,
+        VadOptions(min_silence_duration_ms=LONG_FILE_MIN_SILENCE_MS),
+    )
+    if not speech:
+        return []
+
+    chunk_samples = int(chunk_seconds * SAMPLE_RATE)
+    chunks: list[tuple[int, int]] = []
+    chunk_start = 0
+    previous_end = speech[0]["end"]
+    for span in speech[1:]:
+        if span["end"] - chunk_start > chunk_samples:
+            cut = (previous_end + span["start"]) // 2
+            chunks.append((chunk_start, cut))
+            chunk_start = cut
+        previous_end = span["end"]
+    chunks.append((chunk_start, len(audio)))
+    return chunks
+
+
+def _transcribe_chunk(model: WhisperModel, audio: np.ndarray, start: int, end: int) -> list[dict]:
+    segments, info = model.transcribe(audio[start:end], **TRANSCRIBE_OPTIONS)
+    offset = start / SAMPLE_RATE
+    return [_segment_payload(segment, offset) for segment in segments]
+
+
+def _record_stage(stage_times: dict | None, stage: str, started: float) -> None:
+    if stage_times is not None:
+        stage_times[stage] = time.perf_counter() - started
+
+
+def _segment_payload(segment, offset: float = 0.0) -> dict:
+    payload = {
+        "start": round(segment.start + offset, 2),
+        "end": round(segment.end + offset, 2),
+        "text": segment.text.strip(),
+        "avg_logprob": round(segment.avg_logprob, 3),
+    }
+    if segment.words:
+        payload["words"] = [
+            [round(word.start + offset, 2), round(word.end + offset, 2), word.word, round(word.probability, 3)]
+            for word in segment.words
+        ]
+    return payload
+
+
+def _source_path(source, cleanup: list[str]) -> str:
+    if not isinstance(source, BytesIO):
+        return source
+    # mp4 с moov в конце не читается из пайпа, поэтому контейнер пишем на диск
+    fd, temp_path = tempfile.mkstemp(suffix=".mp4", dir=files_dir)
+    os.close(fd)
+    cleanup.append(temp_path)
+    with open(temp_path, "wb") as f:
+        f.write(source.getbuffer())
+    return temp_path
+
+
+def decode_audio(path: str, duration_hint: float | None = None) -> np.ndarray:
+    process = subprocess.Popen(
+        [
+            "ffmpeg", "-nostdin", "-v", "error",
+            "-i", path,
+            "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),
+            "-f", "f32le", "pipe:1",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    errors: list[bytes] = []
+    stderr_reader = threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+    stderr_reader.start()
+
+    capacity = int(((duration_hint or DECODE_DEFAULT_SECONDS) + 1) * SAMPLE_RATE)
+    audio = np.empty(capacity, dtype=np.float32)
+    filled = 0
+    try:
+        while True:
+            if filled == audio.nbytes:
+                grown = np.empty(audio.size * 2, dtype=np.float32)
+                grown[: audio.size] = audio
+                audio = grown
+            view = memoryview(audio).cast("B")[filled:]
+            read = process.stdout.readinto(view[:PCM_READ_CHUNK])
+            if not read:
+                break
+            filled += read
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+        stderr_reader.join()
+
+    if returncode != 0:
+        message = b"".join(errors).decode(errors="replace").strip()
+        raise RuntimeError(f"ffmpeg failed with code {returncode}: {message}")
+    return audio[: filled // 4]
+
+
+def load_pcm(path: str) -> np.ndarray:
+    return np.fromfile(path, dtype=np.float32)
+
+
+def transcription(
+    source,
+    model_size: str | None = None,
+    on_segment: SegmentCallback | None = None,
+    stage_times: dict | None = None,
+):
     cleanup: list[str] = []
     if isinstance(source, str):
         cleanup.append(source)
@@ -93,16 +517,17 @@ def transcription(source):
         if isinstance(source, BytesIO):
             source.seek(0)
 
-        segments, info = model.transcribe(
-            source,
-            task="transcribe",
-            language=None,
-            condition_on_previous_text=False,
-            beam_size=5,
-            vad_filter=True,
-        )
+        with model_registry.acquire(model_size) as model:
+            started = time.perf_counter()
+            segments, info = model.transcribe(source, **TRANSCRIBE_OPTIONS)
 
-        text = " ".join(s.text for s in segments)
+            texts: list[str] = []
+            for segment in segments:
+                texts.append(segment.text)
+                if on_segment is not None:
+                    on_segment(_segment_payload(segment))
+            text = " ".join(texts)
+            _record_stage(stage_times, "inference", started)
         return text, cleanup
     except Exception as exc:
         raise TranscriptionError(str(exc), cleanup) from exc
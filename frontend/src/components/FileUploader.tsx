@@ -17,6 +17,8 @@ const LIMIT_MESSAGE =
   "Запись длиннее доступного лимита. Сократите файл или обновите тариф, чтобы продолжить расшифровку.";
 
 const delay = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+const STATUS_WAIT_SECONDS = 25;
+const STATUS_MIN_INTERVAL_MS = 1000;
 
 type UploadPhase = Extract<UploadState, "uploading" | "processing">;
 
@@ -54,8 +56,8 @@ export async function uploadToServer(
     }
 
     while (true) {
-      await delay(3500);
-      const statusResponse = await fetch(`${API_BASE_URL}/translate/status?task_id=${taskId}`);
+      // long-poll: сервер держит запрос до изменения статуса, но не дольше wait секунд
+      const statusResponse = await fetch(`${API_BASE_URL}/translate/status?task_id=${taskId}&wait=${STATUS_WAIT_SECONDS}`);
       if (!statusResponse.ok) {
         const message = await statusResponse.text();
         throw new Error(message || "Failed to check status");
@@ -67,6 +69,7 @@ export async function uploadToServer(
       if (statusData.status === "error") {
         throw new Error(statusData.error || "Transcription failed");
       }
+      await delay(STATUS_MIN_INTERVAL_MS);
     }
   } finally {
     clearTimeout(timeout);
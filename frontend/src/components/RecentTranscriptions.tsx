@@ -35,10 +35,13 @@ const buildPreview = (text: string) => {
 };
 
 export default function RecentTranscriptions() {
-  const { items, loading, error } = useRecentTranscriptions();
+  const { items, loading, error, hasMore, loadMore, loadFullText } = useRecentTranscriptions();
   const [expanded, setExpanded] = useState<Record<number, boolean>>({});
 
-  const toggle = (id: number) => {
+  const toggle = (id: number, truncated: boolean) => {
+    if (truncated && !expanded[id]) {
+      void loadFullText(id);
+    }
     setExpanded((prev) => ({
       ...prev,
       [id]: !prev[id],
@@ -52,7 +55,7 @@ export default function RecentTranscriptions() {
           <h2 className="text-2xl font-semibold text-slate-900 dark:text-white">Недавние транскрипции</h2>
         </div>
 
-        {loading && (
+        {loading && items.length === 0 && (
           <div className="flex items-center gap-3 rounded-3xl border border-slate-200/70 bg-white/90 px-4 py-3 text-slate-600 shadow dark:border-slate-800 dark:bg-slate-900/60 dark:text-slate-200">
             <div className="h-6 w-6 animate-spin rounded-full border-2 border-slate-400 border-t-transparent" />
             <span>Загружаем список транскрипций…</span>
@@ -71,7 +74,7 @@ export default function RecentTranscriptions() {
           </p>
         )}
 
-        {!loading && !error && items.length > 0 && (
+        {!error && items.length > 0 && (
           <ul className="space-y-4">
             {items.map((item) => {
               const statusStyle = STATUS_STYLES[item.status] ?? {
@@ -80,7 +83,7 @@ export default function RecentTranscriptions() {
               };
               const isExpanded = Boolean(expanded[item.id]);
               const text = isExpanded ? item.text : buildPreview(item.text);
-              const canToggle = item.text.length > 150;
+              const canToggle = item.truncated || item.text.length > 150;
 
               return (
                 <li
@@ -98,7 +101,7 @@ export default function RecentTranscriptions() {
                     <button
                       type="button"
                       onClick={() => {
-                        toggle(item.id);
+                        toggle(item.id, item.truncated);
                       }}
                       className="mt-3 text-sm font-semibold text-purple-600 transition hover:text-purple-400 dark:text-purple-300"
                     >
@@ -110,6 +113,17 @@ export default function RecentTranscriptions() {
             })}
           </ul>
         )}
+
+        {!error && hasMore && (
+          <button
+            type="button"
+            onClick={loadMore}
+            disabled={loading}
+            className="text-sm font-semibold text-purple-600 transition hover:text-purple-400 disabled:opacity-50 dark:text-purple-300"
+          >
+            {loading ? "Загружаем…" : "Показать ещё"}
+          </button>
+        )}
       </div>
     </section>
   );
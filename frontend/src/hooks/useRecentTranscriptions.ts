@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useCallback, useEffect, useState } from "react";
 import { useAnonUser } from "@/context/AnonUserContext";
 import { useAuth } from "@/context/AuthContext";
 import { API_BASE_URL } from "@/lib/api";
@@ -9,6 +9,7 @@ export type RecentTranscription = {
   createdAt: string;
   status: string;
   text: string;
+  truncated: boolean;
 };
 
 type RecentTranscriptionResponse = {
@@ -16,22 +17,61 @@ type RecentTranscriptionResponse = {
   created_at: string;
   status: string;
   text: string;
+  truncated?: boolean;
 };
 
+type TranscriptionDetailResponse = {
+  id: number;
+  text: string;
+};
+
+const PAGE_SIZE = 20;
+
 export function useRecentTranscriptions(): {
   items: RecentTranscription[];
   loading: boolean;
   error: string | null;
+  hasMore: boolean;
+  loadMore: () => void;
+  loadFullText: (id: number) => Promise<void>;
 } {
   const { user } = useAuth();
   const { anonUser } = useAnonUser();
   const [items, setItems] = useState<RecentTranscription[]>([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [pageCursor, setPageCursor] = useState<string | null>(null);
 
   const userId = user?.id ?? null;
   const anonUuid = anonUser?.uuid ?? null;
 
+  const buildRequest = useCallback(
+    (path: string): { url: URL; headers: Headers } | null => {
+      const url = new URL(`${API_BASE_URL}${path}`);
+      const headers = new Headers();
+
+      if (userId) {
+        const token = getAccessToken();
+        if (token) {
+          headers.set("Authorization", `Bearer ${token}`);
+        }
+      } else if (anonUuid) {
+        url.searchParams.set("anon_uuid", anonUuid);
+      } else {
+        return null;
+      }
+      return { url, headers };
+    },
+    [userId, anonUuid],
+  );
+
+  useEffect(() => {
+    setItems([]);
+    setCursor(null);
+    setPageCursor(null);
+  }, [userId, anonUuid]);
+
   useEffect(() => {
     if (!userId && !anonUuid) {
       return;
@@ -44,19 +84,15 @@ export function useRecentTranscriptions(): {
       setError(null);
 
       try {
-        const url = new URL(`${API_BASE_URL}/transcriptions/recent`);
-        const headers = new Headers();
-
-        if (userId) {
-          const token = getAccessToken();
-          if (token) {
-            headers.set("Authorization", `Bearer ${token}`);
-          }
-        } else if (anonUuid) {
-          url.searchParams.set("anon_uuid", anonUuid);
-        } else {
+        const request = buildRequest("/transcriptions/recent");
+        if (!request) {
           return;
         }
+        const { url, headers } = request;
+        url.searchParams.set("limit", String(PAGE_SIZE));
+        if (pageCursor) {
+          url.searchParams.set("before", pageCursor);
+        }
 
         const response = await fetch(url.toString(), {
           method: "GET",
@@ -78,10 +114,12 @@ export function useRecentTranscriptions(): {
                 createdAt: item.created_at,
                 status: item.status,
                 text: item.text ?? "",
+                truncated: Boolean(item.truncated),
               }))
             : [];
 
-        setItems(mapped);
+        setItems((prev) => (pageCursor ? [...prev, ...mapped] : mapped));
+        setCursor(response.headers.get("X-Next-Cursor"));
       } catch (err) {
         if (controller.signal.aborted) {
           return;
@@ -100,7 +138,36 @@ export function useRecentTranscriptions(): {
     return () => {
       controller.abort();
     };
-  }, [userId, anonUuid]);
+  }, [userId, anonUuid, pageCursor, buildRequest]);
 
-  return { items, loading, error };
+  const loadMore = useCallback(() => {
+    if (cursor) {
+      setPageCursor(cursor);
+    }
+  }, [cursor]);
+
+  // в списке приходит только начало текста, полный текст догружаем по требованию
+  const loadFullText = useCallback(
+    async (id: number) => {
+      const request = buildRequest(`/transcriptions/${id}`);
+      if (!request) {
+        return;
+      }
+      const response = await fetch(request.url.toString(), {
+        method: "GET",
+        headers: request.headers,
+        credentials: "include",
+      });
+      if (!response.ok) {
+        return;
+      }
+      const detail: TranscriptionDetailResponse = await response.json();
+      setItems((prev) =>
+        prev.map((item) => (item.id === detail.id ? { ...item, text: detail.text ?? "", truncated: false } : item)),
+      );
+    },
+    [buildRequest],
+  );
+
+  return { items, loading, error, hasMore: Boolean(cursor), loadMore, loadFullText };
 }
@@ -12,7 +12,7 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent
 if str(BASE_DIR) not in sys.path:
     sys.path.insert(0, str(BASE_DIR))
-from backend.transcription import transcription, which_file
+from tg_bot.service_client import ChatLanes, TranscriptionClient
 from io import BytesIO
 from html import escape
 
@@ -22,6 +22,18 @@ TOKEN = os.getenv("api_token")
 bot = Bot(token=TOKEN, default_bot_properties=DefaultBotProperties(parse_mode=ParseMode.HTML))
 dp= Dispatcher()
 
+# модель живёт только в бэкенде, бот отправляет файлы в его очередь
+transcription_client = TranscriptionClient(
+    os.getenv("TRANSCRIBE_API_URL", "http://127.0.0.1:8000"),
+    os.getenv("INTERNAL_API_TOKEN", ""),
+    socket_path=os.getenv("TRANSCRIBE_API_SOCKET") or None,
+)
+# 1 - файлы одного чата расшифровываются по одному; ответы в любом случае идут по порядку
+chat_lanes = ChatLanes(
+    per_chat=int(os.getenv("CHAT_MAX_CONCURRENCY", "1")),
+    total=int(os.getenv("BOT_MAX_CONCURRENCY", "8")),
+)
+
 max_memory = 20
 files_dir = Path("files")
 files_dir.mkdir(parents = True, exist_ok = True)
@@ -90,7 +102,8 @@ class TranscribeHandler(MessageHandler):
             status = await message.answer("Не удалось получить файл. Попробуйте еще раз.")
             return
         
-        await self.go_to_transcription(message, status, file_obj)
+        content_type = getattr(file_obj, "mime_type", None) or ("video/mp4" if is_video else "audio/ogg")
+        await self.go_to_transcription(message, status, file_obj, content_type)
 
     async def keep_aditing(self, status_msg: Message, stop_event: asyncio.Event):
         dots = 0
@@ -102,9 +115,11 @@ class TranscribeHandler(MessageHandler):
                 pass
             await asyncio.sleep(1)
 
-    async def go_to_transcription(self, message: Message, status_msg: Message, file_obj):
-        bio = BytesIO()
+    async def go_to_transcription(self, message: Message, status_msg: Message, file_obj, content_type: str):
         file_size_mb = (file_obj.file_size or 0)/1024/1024
+        default_ext = ".mp4" if content_type.startswith("video/") else ".ogg"
+        filename = getattr(file_obj, "file_name", None) or f"{file_obj.file_unique_id}{default_ext}"
+        temp_path = None
 
         try:
             if file_size_mb <= max_memory:
@@ -112,71 +127,61 @@ class TranscribeHandler(MessageHandler):
                 if not file_id:
                     await status_msg.edit_text("Не удалось получить идентификатор файла. Попробуйте еще раз.")
                     return
+                bio = BytesIO()
                 await bot.download(file_obj, destination=bio)
-                bio.seek(0)
-                source = bio
+                source = bio.getvalue()
             else:
-                original_name = getattr(file_obj, "file_name", None)
-                ext = Path(original_name).suffix if original_name else ".bin"
-                temp_path = files_dir / f"{file_obj.file_unique_id}{ext}"
+                temp_path = files_dir / f"{file_obj.file_unique_id}{Path(filename).suffix or '.bin'}"
                 await bot.download(file_obj, destination=temp_path)
                 source = temp_path
-            
-            stop_event = asyncio.Event()
-
         except:
             await status_msg.edit_text("Ошибка. Файл слишком большой.")
             return
-        try:
-            editing_task = asyncio.create_task(self.keep_aditing(status_msg, stop_event))
-        except:
-            editing_task = None
-            await status_msg.edit_text("Ошибка при обработке файла. Попробуйте еще раз.")
-            return
 
-        try:
-            text, cleanup = await asyncio.to_thread(which_file, source, media_type=message.content_type)
+        stop_event = asyncio.Event()
+        editing_task = asyncio.create_task(self.keep_aditing(status_msg, stop_event))
+
+        async def work() -> str:
+            return await transcription_client.transcribe(source, filename, content_type, str(message.chat.id))
+
+        async def deliver(text: str | None, error: Exception | None):
             stop_event.set()
             editing_task.cancel()
             try:
                 await editing_task
             except:
                 pass
-            
-            save_text = escape(text)
+
+            if error is not None:
+                print(f"[bot] Transcription failed for chat {message.chat.id}: {error}")
+                await status_msg.edit_text("Ничего не услышал")
+                return
+
+            save_text = escape(text or "")
             parts = split_text(save_text, chunk_size=CHUNK_SIZE)
             if not parts:
-                await status_msg.edit_text(f"Ничего не услышал")
+                await status_msg.edit_text("Ничего не услышал")
                 return
             await status_msg.edit_text(f"{WRAP_PREFIX}{parts[0]}{WRAP_SUFFIX}", parse_mode="HTML")
 
             for part in parts[1:]:
                 await message.answer(f"{WRAP_PREFIX}{part}{WRAP_SUFFIX}", parse_mode="HTML")
-
-            for f in cleanup:
-                try:
-                    if os.path.exists(f):
-                        os.remove(f)
-                except:
-                    pass
             await message.answer("Готово!")
-        except Exception as e:
-            stop_event.set()
-            editing_task.cancel()
-            try:
-                await editing_task
-            except:
-                pass
 
-            await status_msg.edit_text(f"Ничего не услышал")
+        try:
+            await chat_lanes.run(message.chat.id, work, deliver)
         finally:
-            if isinstance(source, (str, Path)) and Path(source).exists():
-                Path(source).unlink()
+            stop_event.set()
+            if temp_path is not None and temp_path.exists():
+                temp_path.unlink()
 
 
 async def main():
     me = await bot.get_me()
     print(f"Бот запущен: @{me.username} (id: {me.id})")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await transcription_client.close()
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
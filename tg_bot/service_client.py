@@ -0,0 +1,116 @@
+# tg_bot/service_client.py
+import asyncio
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import aiohttp
+
+# сколько раз повторять отправку, если очередь сервиса переполнена
+QUEUE_FULL_RETRIES = 20
+DEFAULT_RETRY_AFTER = 5
+
+
+class TranscriptionFailed(Exception):
+    pass
+
+
+# Клиент внутреннего API бэкенда: файл уходит в общую очередь транскрибации,
+# модель в процессе бота не загружается. socket_path - unix-сокет uvicorn (--uds).
+class TranscriptionClient:
+    def __init__(self, base_url: str, token: str, socket_path: str | None = None) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.socket_path = socket_path
+        self._session: aiohttp.ClientSession | None = None
+
+    async def start(self) -> None:
+        if self._session is not None:
+            return
+        connector = aiohttp.UnixConnector(path=self.socket_path) if self.socket_path else None
+        # ответ приходит только когда текст готов, поэтому общего таймаута нет
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=10)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def transcribe(self, source: bytes | Path, filename: str, content_type: str, client_id: str) -> str:
+        await self.start()
+        url = f"{self.base_url}/internal/transcribe"
+        params = {"client_id": client_id, "filename": filename}
+        headers = {"X-Internal-Token": self.token, "Content-Type": content_type}
+        for _ in range(QUEUE_FULL_RETRIES):
+            if isinstance(source, Path):
+                with open(source, "rb") as body:
+                    status, payload, retry_after = await self._post(url, params, headers, body)
+            else:
+                status, payload, retry_after = await self._post(url, params, headers, source)
+            if status == 503:
+                await asyncio.sleep(retry_after)
+                continue
+            if status != 200:
+                raise TranscriptionFailed(payload.get("detail") or f"HTTP {status}")
+            return payload.get("text") or ""
+        raise TranscriptionFailed("Transcription queue is full")
+
+    async def _post(self, url: str, params: dict, headers: dict, body) -> tuple[int, dict, int]:
+        async with self._session.post(url, params=params, headers=headers, data=body) as response:
+            try:
+                payload = await response.json(content_type=None)
+            except ValueError:
+                payload = {}
+            try:
+                retry_after = int(response.headers.get("Retry-After", DEFAULT_RETRY_AFTER))
+            except ValueError:
+                retry_after = DEFAULT_RETRY_AFTER
+            return response.status, payload if isinstance(payload, dict) else {}, retry_after
+
+
+class _Lane:
+    def __init__(self, limit: int) -> None:
+        self.slots = asyncio.Semaphore(limit)
+        self.tail: asyncio.Future | None = None
+        self.users = 0
+
+
+# Очередь сообщений по чатам: в одном чате одновременно обрабатывается не больше
+# per_chat файлов, всего - не больше total, а ответы уходят строго в порядке сообщений.
+class ChatLanes:
+    def __init__(self, per_chat: int, total: int) -> None:
+        self.per_chat = max(1, per_chat)
+        self._total = asyncio.Semaphore(max(1, total))
+        self._lanes: dict[int, _Lane] = {}
+
+    async def run(
+        self,
+        chat_id: int,
+        work: Callable[[], Awaitable[str]],
+        deliver: Callable[[str | None, Exception | None], Awaitable[None]],
+    ) -> None:
+        lane = self._lanes.get(chat_id)
+        if lane is None:
+            lane = self._lanes[chat_id] = _Lane(self.per_chat)
+        lane.users += 1
+        previous = lane.tail
+        delivered = asyncio.get_running_loop().create_future()
+        lane.tail = delivered
+        try:
+            result: str | None = None
+            error: Exception | None = None
+            try:
+                async with lane.slots, self._total:
+                    result = await work()
+            except Exception as exc:
+                error = exc
+            # ответ на предыдущее сообщение чата уходит первым
+            if previous is not None:
+                await previous
+            await deliver(result, error)
+        finally:
+            if not delivered.done():
+                delivered.set_result(None)
+            lane.users -= 1
+            if lane.users == 0:
+                self._lanes.pop(chat_id, None)